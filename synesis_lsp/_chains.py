@@ -0,0 +1,82 @@
+"""
+_chains.py - Extração de triples de chains compartilhada
+
+Propósito:
+    Reconhece os formatos de chain aceitos pelo Explorer (getRelations) e
+    pelo grafo Mermaid e devolve (subject, relation, object).
+
+Notas de implementação:
+    - Ordem de prioridade fixa: o primeiro formato que casa vence
+    - nodes=True sonda também chain.nodes (usado por explorer_requests)
+    - Strings não são internadas aqui; graph.py interna o resultado
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+# Pares (subject, object) aceitos em chains dict, ambos com a chave "relation"
+TRIPLE_DICT_KEYS = (("from", "to"), ("subject", "object"))
+
+# Formatos de atributos sondados por extract_chain_triple, em ordem de
+# prioridade fixa: o primeiro que casa vence
+TRIPLE_ATTR_CANDIDATES: tuple[tuple[str, str, str], ...] = (
+    ("from_code", "relation", "to_code"),
+    ("source", "relation", "target"),
+    ("subject", "relation", "object"),
+    ("subj", "rel", "obj"),
+    ("from", "relation", "to"),
+    ("left", "relation", "right"),
+)
+
+
+def extract_chain_triple(chain, nodes: bool = False) -> Optional[tuple[str, str, str]]:
+    """
+    Extrai (subject, relation, object) de uma chain.
+
+    Formatos, em ordem: tupla/lista de 3 strings, chain.nodes (só com
+    nodes=True), dict com "relation" e atributos de TRIPLE_ATTR_CANDIDATES.
+    """
+    # Caminho rápido por tipo exato: tupla/lista de 3 strings (formato comum)
+    # e strings soltas de extra_fields, que nunca são chains.
+    chain_type = type(chain)
+    if chain_type is str:
+        return None
+    if (chain_type is tuple or chain_type is list) and len(chain) >= 3:
+        subj, rel, obj = chain[0], chain[1], chain[2]
+        if type(subj) is str and type(rel) is str and type(obj) is str:
+            return subj, rel, obj
+
+    if isinstance(chain, (list, tuple)) and len(chain) >= 3:
+        subj, rel, obj = chain[0], chain[1], chain[2]
+        if isinstance(subj, str) and isinstance(rel, str) and isinstance(obj, str):
+            return subj, rel, obj
+
+    if nodes:
+        chain_nodes = getattr(chain, "nodes", None)
+        if isinstance(chain_nodes, (list, tuple)) and len(chain_nodes) >= 3:
+            subj, rel, obj = chain_nodes[0], chain_nodes[1], chain_nodes[2]
+            if isinstance(subj, str) and isinstance(rel, str) and isinstance(obj, str):
+                return subj, rel, obj
+
+    if isinstance(chain, dict):
+        # Os dois formatos compartilham "relation": sem ela (ou não-str), nenhum casa.
+        rel = chain.get("relation")
+        if isinstance(rel, str):
+            for subj_key, obj_key in TRIPLE_DICT_KEYS:
+                if subj_key in chain and obj_key in chain:
+                    subj, obj = chain[subj_key], chain[obj_key]
+                    if isinstance(subj, str) and isinstance(obj, str):
+                        return subj, rel, obj
+        if chain_type is dict:
+            # dict puro não tem os atributos candidatos abaixo
+            return None
+
+    for subj_key, rel_key, obj_key in TRIPLE_ATTR_CANDIDATES:
+        subj = getattr(chain, subj_key, None)
+        rel = getattr(chain, rel_key, None)
+        obj = getattr(chain, obj_key, None)
+        if isinstance(subj, str) and isinstance(rel, str) and isinstance(obj, str):
+            return subj, rel, obj
+
+    return None
@@ -11,6 +11,7 @@ Componentes principais:
     - CachedCompilation: Resultado de compilação com timestamp
     - WorkspaceCache: Dicionário de cache por workspace root
     - FileState: Dirty flags por documento (Fase 2 — padrão Pyright WriteableData)
+    - get_document_lines: linhas do documento memoizadas por URI (hover/inlay hints)
 
 Notas de implementação:
     - Compilação completa (~3.7s) é custosa; cache é essencial
@@ -93,3 +94,35 @@ class FileState:
     validated_content_hash: int = -1
     context_version: int = 0
     last_diagnostics: list = field(default_factory=list)
+
+
+# URI → (texto, linhas). O texto é guardado para o teste de identidade: o
+# pygls devolve o mesmo objeto str enquanto o documento não muda.
+_LINES_CACHE: dict[str, tuple[str, tuple[str, ...]]] = {}
+
+
+def get_document_lines(uri: Optional[str], source: str) -> tuple[str, ...]:
+    """
+    Retorna ``source.splitlines()`` memoizado por URI.
+
+    Hover e inlay hints consultam o mesmo documento várias vezes entre
+    edições; o split só é refeito quando o conteúdo muda.
+    """
+    if uri is None:
+        return tuple(source.splitlines())
+    cached = _LINES_CACHE.get(uri)
+    if cached is not None:
+        cached_source, lines = cached
+        if cached_source is source:
+            return lines
+        if cached_source == source:
+            _LINES_CACHE[uri] = (source, lines)
+            return lines
+    lines = tuple(source.splitlines())
+    _LINES_CACHE[uri] = (source, lines)
+    return lines
+
+
+def clear_document_lines(uri: str) -> None:
+    """Descarta as linhas memoizadas de um documento (didClose)."""
+    _LINES_CACHE.pop(uri, None)
@@ -19,22 +19,60 @@ Notas de implementação:
 from __future__ import annotations
 
 import logging
+import sys
+import weakref
+from collections import OrderedDict
+from functools import lru_cache
+from operator import attrgetter
 from pathlib import Path
 from typing import Iterable, Optional
 from urllib.parse import unquote, urlparse
 
-from synesis.ast.normalize import normalize_code as _normalize_code
+from synesis.ast.normalize import normalize_code
+
+from synesis_lsp._chains import extract_chain_triple
 
 logger = logging.getLogger(__name__)
 
-_RELATIONS_CACHE: dict[tuple[str, float], dict] = {}
+# Memoizado: o mesmo punhado de códigos se repete em todos os items do projeto
+_normalize_code = lru_cache(maxsize=8192)(normalize_code)
+
+# LRU: hits movem a entrada para o fim; overflow descarta a menos recente
+_RELATIONS_CACHE: OrderedDict[tuple[str, float], dict] = OrderedDict()
 _RELATIONS_CACHE_MAX = 4
 
-_CODES_CACHE: dict[tuple, dict] = {}
+_CODES_CACHE: OrderedDict[tuple[str, float], dict] = OrderedDict()
 _CODES_CACHE_MAX = 4
 
+# Workspace root do último getCodes/getRelations (ver _clear_memo_on_workspace_change)
+_last_workspace_key: Optional[str] = None
+
+# Busca file/line/column numa única chamada em C (hot path de locations)
+_LOC_ATTRS = attrgetter("file", "line", "column")
+
+# Tipos de chain compartilhados por todas as entradas do índice de relações
+_TYPE_QUALIFIED = sys.intern("qualified")
+_TYPE_SIMPLE = sys.intern("simple")
+
+# Atributos candidatos a índice de uso de códigos no LinkedProject; o nome
+# efetivo é resolvido uma vez por instância (ver _resolve_code_usage_attr)
+_CODE_USAGE_ATTRS = (
+    "code_usage",
+    "code_usage_index",
+    "code_usage_by_code",
+    "code_usage_map",
+)
+_LP_USAGE_ATTR_CACHE: dict[int, tuple[weakref.ref, Optional[str]]] = {}
+_LP_USAGE_ATTR_CACHE_MAX = 4
+
 
-def _relations_cache_key(cached_result, workspace_root: Optional[Path]) -> Optional[tuple[str, int, float]]:
+def _relations_cache_key(cached_result, workspace_root: Optional[Path]) -> Optional[tuple[str, float]]:
+    """
+    Chave estável por (workspace_root, timestamp da compilação).
+
+    Não inclui ``id(cached_result)``: um wrapper novo sobre a mesma compilação
+    deve acertar o cache, e o timestamp já muda a cada recompilação.
+    """
     if not cached_result:
         return None
     root = workspace_root or getattr(cached_result, "workspace_root", None)
@@ -42,17 +80,53 @@ def _relations_cache_key(cached_result, workspace_root: Optional[Path]) -> Optio
     timestamp = getattr(cached_result, "timestamp", None)
     if timestamp is None:
         return None
-    return (root_key, id(cached_result), float(timestamp))
+    return (root_key, float(timestamp))
 
 
-def _relations_cache_set(key: Optional[tuple[str, float]], value: dict) -> None:
+def _clear_memo_on_workspace_change(cache_key: Optional[tuple[str, float]]) -> None:
+    """
+    Esvazia os memos de normalização quando o workspace ativo muda.
+
+    Os lru_cache já são limitados; isto evita que entradas de um projeto
+    anterior ocupem espaço enquanto outro está em uso.
+    """
+    global _last_workspace_key
+    if not cache_key:
+        return
+    root_key = cache_key[0]
+    if root_key == _last_workspace_key:
+        return
+    if _last_workspace_key is not None:
+        _normalize_code.cache_clear()
+        _relativize_path.cache_clear()
+        _normalize_file_path.cache_clear()
+    _last_workspace_key = root_key
+
+
+def _lru_get(cache: OrderedDict, key: Optional[tuple[str, float]]) -> Optional[dict]:
+    if not key:
+        return None
+    cached = cache.get(key)
+    if cached is not None:
+        cache.move_to_end(key)
+    return cached
+
+
+def _lru_set(cache: OrderedDict, max_size: int, key: Optional[tuple[str, float]], value: dict) -> None:
     if not key:
         return
-    _RELATIONS_CACHE[key] = value
-    if len(_RELATIONS_CACHE) > _RELATIONS_CACHE_MAX:
-        oldest_key = next(iter(_RELATIONS_CACHE))
-        if oldest_key != key:
-            _RELATIONS_CACHE.pop(oldest_key, None)
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > max_size:
+        cache.popitem(last=False)
+
+
+def _relations_cache_get(key: Optional[tuple[str, float]]) -> Optional[dict]:
+    return _lru_get(_RELATIONS_CACHE, key)
+
+
+def _relations_cache_set(key: Optional[tuple[str, float]], value: dict) -> None:
+    _lru_set(_RELATIONS_CACHE, _RELATIONS_CACHE_MAX, key, value)
 
 
 def get_references(cached_result) -> dict:
@@ -70,10 +144,15 @@ def get_references(cached_result) -> dict:
     refs = []
     for bibref, src in lp.sources.items():
         bib_entry = bibliography.get(src.bibref) or bibliography.get(src.bibref.lower()) or {}
+        # Sem cópia quando já é dict: o serializador JSON só lê o mapping
+        # (MappingProxyType não seria serializável pelo transporte)
+        fields = src.fields or {}
+        if not isinstance(fields, dict):
+            fields = dict(fields)
         ref_entry = {
             "bibref": src.bibref,
             "itemCount": len(src.items),
-            "fields": dict(src.fields) if src.fields else {},
+            "fields": fields,
             "title": bib_entry.get("title", ""),
         }
         if src.location:
@@ -92,7 +171,8 @@ def get_codes(cached_result) -> dict:
     Retorna lista de códigos com frequência de uso.
 
     Cada código inclui: code, usageCount, ontologyDefined, occurrences.
-    Resultado cacheado por (id(cached_result), timestamp) — mesmo padrão de get_relations.
+    Resultado cacheado (LRU) por (workspace_root, timestamp) — mesmo padrão de
+    get_relations. O dict cacheado é devolvido por referência: somente leitura.
     """
     lp = _get_linked_project(cached_result)
     if lp is None:
@@ -100,58 +180,43 @@ def get_codes(cached_result) -> dict:
 
     workspace_root = getattr(cached_result, "workspace_root", None)
     cache_key = _relations_cache_key(cached_result, workspace_root)
-    cached = _CODES_CACHE.get(cache_key) if cache_key else None
+    _clear_memo_on_workspace_change(cache_key)
+    cached = _lru_get(_CODES_CACHE, cache_key)
     if cached is not None:
         return cached
 
     template = getattr(getattr(cached_result, "result", None), "template", None)
     field_specs = getattr(template, "field_specs", {}) if template else {}
 
-    code_fields, chain_fields, chain_relations = _item_field_maps(field_specs)
-    include_code = True
-    include_chain = True
+    code_fields, chain_fields, chain_relations, field_kinds = _item_field_maps(field_specs)
 
     codes = []
-    raw_usage = _get_code_usage(lp, field_specs) or {}
-    code_usage: dict[str, list] = {}
+    raw_usage = _get_code_usage(lp, field_specs, field_kinds) or {}
+    # Buckets id(item) → item: a normalização pode mesclar listas de chaves
+    # diferentes que referenciam o mesmo ItemNode, então deduplicamos por
+    # identidade já na acumulação (dict preserva a ordem de inserção)
+    code_usage: dict[str, dict[int, object]] = {}
     for code, items in raw_usage.items():
-        norm_code = _normalize_code(code)
-        code_usage.setdefault(norm_code, []).extend(items)
+        bucket = code_usage.setdefault(_normalize_code(code), {})
+        for item in items:
+            bucket.setdefault(id(item), item)
 
     # Garantir presença de todos os códigos da ontologia, mesmo sem uso
     ontology_index = getattr(lp, "ontology_index", {}) or {}
     for code in ontology_index.keys():
-        code_usage.setdefault(code, [])
-
-    # Deduplicar items por identidade de objeto (normalizacao pode mesclar
-    # listas de chaves diferentes que referenciam o mesmo ItemNode)
-    for code in code_usage:
-        items = code_usage[code]
-        seen_ids: set[int] = set()
-        unique: list = []
-        for item in items:
-            item_id = id(item)
-            if item_id not in seen_ids:
-                seen_ids.add(item_id)
-                unique.append(item)
-        code_usage[code] = unique
+        code_usage.setdefault(code, {})
 
-    for code, items in (code_usage or {}).items():
+    for code, bucket in code_usage.items():
         occurrences = _build_code_occurrences(
             code,
-            items,
+            bucket.values(),
             field_specs,
             workspace_root,
             code_fields=code_fields,
             chain_fields=chain_fields,
             chain_relations=chain_relations,
+            field_kinds=field_kinds,
         )
-        occurrences = _filter_occurrences_by_template(
-            occurrences,
-            include_code=include_code,
-            include_chain=include_chain,
-        )
-        occurrences = _dedupe_occurrences(occurrences)
         codes.append(
             {
                 "code": code,
@@ -162,12 +227,7 @@ def get_codes(cached_result) -> dict:
         )
 
     result = {"success": True, "codes": codes}
-    if cache_key:
-        _CODES_CACHE[cache_key] = result
-        if len(_CODES_CACHE) > _CODES_CACHE_MAX:
-            oldest_key = next(iter(_CODES_CACHE))
-            if oldest_key != cache_key:
-                _CODES_CACHE.pop(oldest_key, None)
+    _lru_set(_CODES_CACHE, _CODES_CACHE_MAX, cache_key, result)
     return result
 
 
@@ -183,23 +243,37 @@ def get_relations(cached_result) -> dict:
 
     workspace_root = getattr(cached_result, "workspace_root", None)
     cache_key = _relations_cache_key(cached_result, workspace_root)
-    cached = _RELATIONS_CACHE.get(cache_key) if cache_key else None
+    _clear_memo_on_workspace_change(cache_key)
+    cached = _relations_cache_get(cache_key)
     if cached is not None:
         return cached
 
-    relation_index = _build_relation_index(lp, workspace_root)
-    relations = []
     triples = getattr(lp, "all_triples", None) or []
-    for s, r, o in triples:
+    if not triples:
+        # Projeto sem relações: não percorre sources para montar o índice
+        result = {"success": True, "relations": []}
+        _relations_cache_set(cache_key, result)
+        return result
+
+    relation_index = _build_relation_index(lp, workspace_root)
+    relations: list[dict] = []
+    # Loop quente (um passo por triple): métodos resolvidos uma vez e o
+    # próprio triple reaproveitado como chave quando já é tupla
+    lookup = relation_index.get
+    append = relations.append
+    for triple in triples:
+        s, r, o = triple
+        indexed = lookup(triple if type(triple) is tuple else (s, r, o))
+        if indexed is None:
+            indexed = lookup(_normalize_triple(s, r, o))
         entry = {"from": s, "relation": r, "to": o}
-        key = _normalize_triple(s, r, o)
-        indexed = relation_index.get(key)
         if indexed:
-            if indexed.get("location"):
-                entry["location"] = indexed["location"]
-            if indexed.get("type"):
-                entry["type"] = indexed["type"]
-        relations.append(entry)
+            loc, chain_type = indexed
+            if loc:
+                entry["location"] = loc
+            if chain_type:
+                entry["type"] = chain_type
+        append(entry)
 
     result = {"success": True, "relations": relations}
     _relations_cache_set(cache_key, result)
@@ -218,12 +292,12 @@ def _get_linked_project(cached_result) -> Optional[object]:
 
 
 def _iter_sources(sources) -> Iterable:
+    # View/container direto em vez de gerador: sem frame extra por SOURCE.
     if isinstance(sources, dict):
-        yield from sources.values()
-        return
+        return sources.values()
     if isinstance(sources, (list, tuple, set)):
-        yield from sources
-        return
+        return sources
+    return ()
 
 
 def _normalize_triple(subject: str, relation: str, obj: str) -> tuple[str, str, str]:
@@ -234,6 +308,7 @@ def _normalize_triple(subject: str, relation: str, obj: str) -> tuple[str, str,
     )
 
 
+@lru_cache(maxsize=2048)
 def _normalize_file_path(path_str: str) -> Optional[Path]:
     if not path_str:
         return None
@@ -248,7 +323,10 @@ def _normalize_file_path(path_str: str) -> Optional[Path]:
     return Path(path_str)
 
 
+@lru_cache(maxsize=4096)
 def _relativize_path(path_str: str, workspace_root: Optional[Path]) -> str:
+    # Memoizado por (path_str, workspace_root): chamado por code_location,
+    # nó de chain e item, quase sempre com o mesmo punhado de arquivos
     path = _normalize_file_path(path_str)
     if not path:
         return path_str
@@ -260,58 +338,78 @@ def _relativize_path(path_str: str, workspace_root: Optional[Path]) -> str:
     return path.as_posix()
 
 
-def _iter_string_values(value) -> Iterable[str]:
+def _iter_string_values(value) -> list[str]:
+    """
+    Strings folha de um valor aninhado, em ordem de travessia (DFS).
+
+    Pilha explícita em vez de recursão com ``yield from`` — caminho quente de
+    toda checagem de código. A ordem importa: os valores são pareados por
+    índice com ``code_locations``.
+    """
     if isinstance(value, str):
-        yield value
-        return
-    if isinstance(value, (list, tuple, set)):
-        for item in value:
-            yield from _iter_string_values(item)
-        return
-    if isinstance(value, dict):
-        for item in value.values():
-            yield from _iter_string_values(item)
+        return [value]
+    out: list[str] = []
+    stack = [value]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, str):
+            out.append(current)
+        elif isinstance(current, (list, tuple)):
+            stack.extend(reversed(current))
+        elif isinstance(current, set):
+            stack.extend(reversed(tuple(current)))
+        elif isinstance(current, dict):
+            stack.extend(reversed(current.values()))
+    return out
 
 
 def _iter_chain_values(value) -> Iterable:
     if isinstance(value, (list, tuple, set)):
-        for item in value:
-            yield item
-        return
+        return value
     if isinstance(value, dict):
-        for item in value.values():
-            yield item
-        return
-    yield value
+        return value.values()
+    return (value,)
 
 
-def _chain_nodes(chain) -> list[str]:
+def _raw_chain_nodes(chain) -> Iterable:
+    """Nós da chain sem filtrar/normalizar (cada formato suportado)."""
     if chain is None:
-        return []
+        return ()
     if isinstance(chain, str):
-        if "->" in chain:
-            return [part.strip() for part in chain.split("->") if part.strip()]
-        return [chain]
+        return chain.split("->") if "->" in chain else (chain,)
     if isinstance(chain, dict):
         nodes = chain.get("nodes")
         if isinstance(nodes, (list, tuple)):
-            return [n for n in nodes if isinstance(n, str) and n.strip()]
+            return nodes
         # Try common triple dict shapes
         for keys in (("from", "relation", "to"), ("subject", "relation", "object")):
             if all(k in chain for k in keys):
-                parts = [chain[keys[0]], chain[keys[1]], chain[keys[2]]]
-                return [p for p in parts if isinstance(p, str) and p.strip()]
-        return []
+                return (chain[keys[0]], chain[keys[1]], chain[keys[2]])
+        return ()
     nodes = getattr(chain, "nodes", None)
     if isinstance(nodes, (list, tuple)):
-        return [n for n in nodes if isinstance(n, str) and n.strip()]
+        return nodes
     if isinstance(chain, (list, tuple, set)):
-        return [n for n in chain if isinstance(n, str) and n.strip()]
-    return []
+        return chain
+    return ()
+
+
+def _chain_nodes(chain) -> list[str]:
+    if isinstance(chain, str):
+        if "->" in chain:
+            return [part.strip() for part in chain.split("->") if part.strip()]
+        return [chain]
+    return [n for n in _raw_chain_nodes(chain) if isinstance(n, str) and n.strip()]
 
 
 def _extract_chain_codes(chain, field_spec=None) -> list[str]:
-    nodes = [n.strip() for n in _chain_nodes(chain) if isinstance(n, str) and n.strip()]
+    # Passada única: strip uma vez por nó, sem a lista intermediária de _chain_nodes
+    nodes: list[str] = []
+    for node in _raw_chain_nodes(chain):
+        if isinstance(node, str):
+            node = node.strip()
+            if node:
+                nodes.append(node)
     if not nodes:
         return []
     has_relations = bool(getattr(field_spec, "relations", None))
@@ -334,10 +432,19 @@ def _chain_value_contains_code(value, code: str, field_spec=None) -> bool:
 
 
 def _value_contains_code(value, code: str) -> bool:
+    # Travessia própria (não _iter_string_values) para sair no primeiro
+    # acerto sem materializar a lista de strings; a ordem não importa aqui
     target = _normalize_code(code)
-    for item in _iter_string_values(value):
-        if _normalize_code(item) == target:
-            return True
+    stack = [value]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, str):
+            if _normalize_code(current) == target:
+                return True
+        elif isinstance(current, (list, tuple, set)):
+            stack.extend(current)
+        elif isinstance(current, dict):
+            stack.extend(current.values())
     return False
 
 
@@ -359,7 +466,32 @@ def _is_code_field(spec) -> bool:
     return "CODE" in type_name.upper() and "CHAIN" not in type_name.upper()
 
 
-def _item_field_maps(field_specs: dict) -> tuple[set[str], set[str], dict[str, bool]]:
+_FIELD_CODE = "code"
+_FIELD_CHAIN = "chain"
+_FIELD_OTHER = "other"
+
+
+def _field_kinds(field_specs: dict) -> dict[str, str]:
+    """
+    Classifica cada campo do template (code/chain/other) uma única vez.
+
+    Chaveado pelo nome declarado, como em ``field_specs.get(field_name)``;
+    campos ausentes do template equivalem a ``_FIELD_OTHER``.
+    """
+    kinds: dict[str, str] = {}
+    for name, spec in (field_specs or {}).items():
+        if _is_chain_field(spec):
+            kinds[name] = _FIELD_CHAIN
+        elif _is_code_field(spec):
+            kinds[name] = _FIELD_CODE
+        else:
+            kinds[name] = _FIELD_OTHER
+    return kinds
+
+
+def _item_field_maps(
+    field_specs: dict,
+) -> tuple[set[str], set[str], dict[str, bool], dict[str, str]]:
     code_fields: set[str] = {"code", "codes"}
     chain_fields: set[str] = {"chain", "chains"}
     chain_relations: dict[str, bool] = {}
@@ -385,21 +517,46 @@ def _item_field_maps(field_specs: dict) -> tuple[set[str], set[str], dict[str, b
     for field_name in chain_fields:
         chain_relations.setdefault(field_name, False)
 
-    return code_fields, chain_fields, chain_relations
+    return code_fields, chain_fields, chain_relations, _field_kinds(field_specs)
 
 
-def _get_code_usage(lp, field_specs) -> dict:
-    raw_usage = None
-    for attr_name in (
-        "code_usage",
-        "code_usage_index",
-        "code_usage_by_code",
-        "code_usage_map",
-    ):
+def _resolve_code_usage_attr(lp) -> Optional[str]:
+    """
+    Nome do atributo de uso de códigos exposto pelo LinkedProject.
+
+    Sondado uma vez por instância de ``lp``. A chave é ``id(lp)`` (dataclasses
+    não são hashable) validada por weakref, para que um id reciclado por outro
+    projeto não reaproveite a resolução antiga.
+    """
+    lp_id = id(lp)
+    cached = _LP_USAGE_ATTR_CACHE.get(lp_id)
+    if cached is not None:
+        lp_ref, attr_name = cached
+        if lp_ref() is lp:
+            return attr_name
+
+    attr_name = _probe_code_usage_attr(lp)
+    try:
+        lp_ref = weakref.ref(lp)
+    except TypeError:
+        return attr_name
+    _LP_USAGE_ATTR_CACHE[lp_id] = (lp_ref, attr_name)
+    while len(_LP_USAGE_ATTR_CACHE) > _LP_USAGE_ATTR_CACHE_MAX:
+        _LP_USAGE_ATTR_CACHE.pop(next(iter(_LP_USAGE_ATTR_CACHE)))
+    return attr_name
+
+
+def _probe_code_usage_attr(lp) -> Optional[str]:
+    for attr_name in _CODE_USAGE_ATTRS:
         value = getattr(lp, attr_name, None)
         if value and hasattr(value, "items"):
-            raw_usage = value
-            break
+            return attr_name
+    return None
+
+
+def _get_code_usage(lp, field_specs, field_kinds: Optional[dict[str, str]] = None) -> dict:
+    attr_name = _resolve_code_usage_attr(lp)
+    raw_usage = getattr(lp, attr_name, None) if attr_name else None
 
     if not raw_usage:
         return _build_code_usage_from_sources(
@@ -407,6 +564,7 @@ def _get_code_usage(lp, field_specs) -> dict:
             field_specs,
             include_code=True,
             include_chain=True,
+            field_kinds=field_kinds,
         )
 
     usage: dict[str, list] = {}
@@ -419,6 +577,7 @@ def _get_code_usage(lp, field_specs) -> dict:
         field_specs,
         include_code=False,
         include_chain=True,
+        field_kinds=field_kinds,
     )
     for code, items in chain_usage.items():
         if code in usage:
@@ -434,7 +593,10 @@ def _build_code_usage_from_sources(
     *,
     include_code: bool = True,
     include_chain: bool = True,
+    field_kinds: Optional[dict[str, str]] = None,
 ) -> dict:
+    if field_kinds is None:
+        field_kinds = _field_kinds(field_specs)
     usage: dict[str, list] = {}
     sources = getattr(lp, "sources", {}) or {}
     for src in _iter_sources(sources):
@@ -444,6 +606,7 @@ def _build_code_usage_from_sources(
                 field_specs,
                 include_code=include_code,
                 include_chain=include_chain,
+                field_kinds=field_kinds,
             ):
                 usage.setdefault(code, []).append(item)
     return usage
@@ -455,7 +618,11 @@ def _iter_codes_from_item(
     *,
     include_code: bool = True,
     include_chain: bool = True,
+    field_kinds: Optional[dict[str, str]] = None,
 ) -> Iterable[str]:
+    if field_kinds is None:
+        field_kinds = _field_kinds(field_specs)
+
     if include_code:
         codes = getattr(item, "codes", None) or []
         for code in codes:
@@ -472,15 +639,16 @@ def _iter_codes_from_item(
 
     extra_fields = getattr(item, "extra_fields", {}) or {}
     for field_name, value in extra_fields.items():
-        spec = field_specs.get(field_name) if field_specs else None
-        if _is_chain_field(spec):
+        kind = field_kinds.get(field_name, _FIELD_OTHER)
+        if kind == _FIELD_CHAIN:
             if include_chain:
+                spec = field_specs.get(field_name)
                 for candidate in _iter_chain_values(value):
                     for chain_code in _extract_chain_codes(candidate, spec):
                         if isinstance(chain_code, str) and chain_code.strip():
                             yield chain_code
             continue
-        if not _is_code_field(spec):
+        if kind != _FIELD_CODE:
             continue
         if not include_code:
             continue
@@ -490,7 +658,6 @@ def _iter_codes_from_item(
 
 
 
-
 def _get_item_location(item):
     """Resolve best-available location for an item."""
     loc = getattr(item, "location", None)
@@ -515,9 +682,12 @@ def _location_to_occurrence(
         line = location.get("line")
         column = location.get("column")
     else:
-        file_val = getattr(location, "file", None)
-        line = getattr(location, "line", None)
-        column = getattr(location, "column", None)
+        try:
+            file_val, line, column = _LOC_ATTRS(location)
+        except AttributeError:
+            file_val = getattr(location, "file", None)
+            line = getattr(location, "line", None)
+            column = getattr(location, "column", None)
     if not file_val:
         file_val = fallback_file
     if not file_val or line is None or column is None:
@@ -531,9 +701,9 @@ def _location_to_occurrence(
 
 def _iter_value_locations(values: list[str], locations: list) -> Iterable[tuple[str, object]]:
     if not values or not locations:
-        return []
-    limit = min(len(values), len(locations))
-    return [(values[idx], locations[idx]) for idx in range(limit)]
+        return ()
+    # zip para no menor dos dois — sem lista intermediária
+    return zip(values, locations)
 
 
 
@@ -591,6 +761,17 @@ def _iter_chain_code_locations(chain, has_relations: bool) -> list[tuple[str, ob
     return [(nodes[idx], locations[idx]) for idx in indices]
 
 
+def _field_key(field_name) -> str:
+    """
+    Campo normalizado para as chaves de deduplicação de occurrences.
+
+    Duplicatas podem surgir de fases distintas da compilação (transformer +
+    linker) populando code_locations; o campo em minúsculas faz "CODE" e
+    "code" colidirem já no ``seen`` de cada append.
+    """
+    return sys.intern(str(field_name or "").lower())
+
+
 def _append_precise_occurrences(
     occurrences: list[dict],
     seen: set[tuple],
@@ -637,7 +818,7 @@ def _append_precise_occurrences(
             if not loc_info:
                 continue
             file_rel, line, column = loc_info
-            key = (file_rel, line, column, value_field, "code")
+            key = (file_rel, line, column, _field_key(value_field), "code")
             if key in seen:
                 found_any = True
                 found_code_precise = True
@@ -661,7 +842,9 @@ def _append_precise_occurrences(
             or getattr(chain, "field", None)
             or "chain"
         )
-        has_relations = chain_relations.get(str(field_name).lower(), False)
+        # Uma vez por chain: serve ao lookup de relations e à chave de dedupe
+        field_key = _field_key(field_name)
+        has_relations = chain_relations.get(field_key, False)
         for value, loc in _iter_chain_code_locations(chain, has_relations):
             if _normalize_code(value) != normalized_code:
                 continue
@@ -669,7 +852,7 @@ def _append_precise_occurrences(
             if not loc_info:
                 continue
             file_rel, line, column = loc_info
-            key = (file_rel, line, column, field_name, "chain")
+            key = (file_rel, line, column, field_key, "chain")
             if key in seen:
                 found_any = True
                 continue
@@ -688,6 +871,7 @@ def _append_precise_occurrences(
     for field_name, value in extra_fields.items():
         spec = field_specs.get(field_name) if field_specs else None
         has_relations = bool(getattr(spec, "relations", None))
+        field_key = _field_key(field_name)
         for chain in _iter_chain_values(value):
             for chain_value, loc in _iter_chain_code_locations(chain, has_relations):
                 if _normalize_code(chain_value) != normalized_code:
@@ -696,7 +880,7 @@ def _append_precise_occurrences(
                 if not loc_info:
                     continue
                 file_rel, line, column = loc_info
-                key = (file_rel, line, column, field_name, "chain")
+                key = (file_rel, line, column, field_key, "chain")
                 if key in seen:
                     found_any = True
                     continue
@@ -725,13 +909,21 @@ def _build_code_occurrences(
     code_fields: Optional[set[str]] = None,
     chain_fields: Optional[set[str]] = None,
     chain_relations: Optional[dict[str, bool]] = None,
+    field_kinds: Optional[dict[str, str]] = None,
 ) -> list[dict]:
     occurrences: list[dict] = []
     seen: set[tuple] = set()
     normalized_code = _normalize_code(code)
 
-    if code_fields is None or chain_fields is None or chain_relations is None:
-        code_fields, chain_fields, chain_relations = _item_field_maps(field_specs or {})
+    if (
+        code_fields is None
+        or chain_fields is None
+        or chain_relations is None
+        or field_kinds is None
+    ):
+        code_fields, chain_fields, chain_relations, field_kinds = _item_field_maps(
+            field_specs or {}
+        )
 
     for item in items:
         item_loc = _get_item_location(item)
@@ -778,10 +970,8 @@ def _build_code_occurrences(
         )
         extra_fields = getattr(item, "extra_fields", {}) or {}
         for field_name, value in extra_fields.items():
-            spec = field_specs.get(field_name) if field_specs else None
-            is_chain_field = _is_chain_field(spec)
-
-            if is_chain_field:
+            if field_kinds.get(field_name, _FIELD_OTHER) == _FIELD_CHAIN:
+                spec = field_specs.get(field_name)
                 if not _chain_value_contains_code(value, code, spec):
                     continue
                 for candidate in _iter_chain_values(value):
@@ -791,7 +981,7 @@ def _build_code_occurrences(
                     chain_loc = getattr(candidate, "location", None)
                     occ_line = getattr(chain_loc, "line", line) if chain_loc else line
                     occ_column = getattr(chain_loc, "column", column) if chain_loc else column
-                    key = (file_path, occ_line, occ_column, field_name, "chain")
+                    key = (file_path, occ_line, occ_column, _field_key(field_name), "chain")
                     if key not in seen:
                         seen.add(key)
                         occurrences.append({
@@ -806,7 +996,7 @@ def _build_code_occurrences(
             if not _value_contains_code(value, code):
                 continue
 
-            key = (file_path, line, column, field_name, "code")
+            key = (file_path, line, column, _field_key(field_name), "code")
             if key not in seen:
                 seen.add(key)
                 occurrences.append({
@@ -832,7 +1022,7 @@ def _build_code_occurrences(
                 chain_loc = getattr(chain, "location", None)
                 occ_line = getattr(chain_loc, "line", line) if chain_loc else line
                 occ_column = getattr(chain_loc, "column", column) if chain_loc else column
-                key = (file_path, occ_line, occ_column, field_name, "chain")
+                key = (file_path, occ_line, occ_column, _field_key(field_name), "chain")
                 if key not in seen:
                     seen.add(key)
                     occurrences.append({
@@ -845,7 +1035,7 @@ def _build_code_occurrences(
 
         codes_list = getattr(item, "codes", None) or []
         if any(_normalize_code(c) == normalized_code for c in codes_list):
-            key = (file_path, line, column, "CODE", "code")
+            key = (file_path, line, column, "code", "code")
             if key not in seen:
                 seen.add(key)
                 occurrences.append({
@@ -859,95 +1049,6 @@ def _build_code_occurrences(
     return occurrences
 
 
-def _filter_occurrences_by_template(
-    occurrences: list[dict],
-    *,
-    include_code: bool,
-    include_chain: bool,
-) -> list[dict]:
-    if include_code and include_chain:
-        return occurrences
-    if not include_code and not include_chain:
-        return []
-    filtered = []
-    for occ in occurrences:
-        context = (occ or {}).get("context")
-        if context == "code" and include_code:
-            filtered.append(occ)
-        elif context == "chain" and include_chain:
-            filtered.append(occ)
-    return filtered
-
-
-
-
-def _dedupe_occurrences(occurrences: list[dict]) -> list[dict]:
-    """
-    Remove exact duplicates based on file/line/column/context/field.
-
-    This prevents duplicates that may arise from multiple compilation phases
-    (transformer + linker) both populating code_locations.  Field names are
-    normalized to lowercase so that "CODE" and "code" are treated as the same.
-    """
-    if not occurrences:
-        return []
-
-    seen: set[tuple] = set()
-    result: list[dict] = []
-    for occ in occurrences:
-        if not occ:
-            continue
-        key = (
-            occ.get("file"),
-            occ.get("line"),
-            occ.get("column"),
-            occ.get("context"),
-            (occ.get("field") or "").lower(),
-        )
-        if key not in seen:
-            seen.add(key)
-            result.append(occ)
-
-    return result
-
-
-def _extract_chain_triple(chain) -> Optional[tuple[str, str, str]]:
-    if isinstance(chain, (list, tuple)) and len(chain) >= 3:
-        subj, rel, obj = chain[0], chain[1], chain[2]
-        if isinstance(subj, str) and isinstance(rel, str) and isinstance(obj, str):
-            return subj, rel, obj
-
-    nodes = getattr(chain, "nodes", None)
-    if isinstance(nodes, (list, tuple)) and len(nodes) >= 3:
-        subj, rel, obj = nodes[0], nodes[1], nodes[2]
-        if isinstance(subj, str) and isinstance(rel, str) and isinstance(obj, str):
-            return subj, rel, obj
-
-    if isinstance(chain, dict):
-        for keys in (("from", "relation", "to"), ("subject", "relation", "object")):
-            if all(k in chain for k in keys):
-                subj, rel, obj = chain[keys[0]], chain[keys[1]], chain[keys[2]]
-                if isinstance(subj, str) and isinstance(rel, str) and isinstance(obj, str):
-                    return subj, rel, obj
-
-    candidates = [
-        ("from_code", "relation", "to_code"),
-        ("source", "relation", "target"),
-        ("subject", "relation", "object"),
-        ("subj", "rel", "obj"),
-        ("from", "relation", "to"),
-        ("left", "relation", "right"),
-    ]
-    for subj_key, rel_key, obj_key in candidates:
-        subj = getattr(chain, subj_key, None)
-        rel = getattr(chain, rel_key, None)
-        obj = getattr(chain, obj_key, None)
-        if isinstance(subj, str) and isinstance(rel, str) and isinstance(obj, str):
-            return subj, rel, obj
-
-    return None
-
-
 def _extract_chain_type(chain) -> Optional[str]:
     """
     Detect chain type: "qualified" or "simple".
@@ -963,15 +1064,15 @@ def _extract_chain_type(chain) -> Optional[str]:
         else:
             value = getattr(chain, key, None)
         if value:
-            return "qualified"
+            return _TYPE_QUALIFIED
 
     # Check string format for "::" separator (means qualified)
     chain_str = _chain_to_string(chain)
     if chain_str and "::" in chain_str:
-        return "qualified"
+        return _TYPE_QUALIFIED
 
     # Default: simple chain
-    return "simple"
+    return _TYPE_SIMPLE
 
 
 def _chain_to_string(chain) -> Optional[str]:
@@ -1009,9 +1110,10 @@ def _location_dict(location, workspace_root: Optional[Path]) -> Optional[dict]:
         line = location.get("line")
         column = location.get("column")
     else:
-        file_val = getattr(location, "file", None)
-        line = getattr(location, "line", None)
-        column = getattr(location, "column", None)
+        try:
+            file_val, line, column = _LOC_ATTRS(location)
+        except AttributeError:
+            return None
     if not file_val or line is None or column is None:
         return None
     return {
@@ -1022,18 +1124,33 @@ def _location_dict(location, workspace_root: Optional[Path]) -> Optional[dict]:
 
 
 def _build_relation_index(lp, workspace_root: Optional[Path]) -> dict:
-    index: dict[tuple[str, str, str], dict] = {}
+    """
+    Indexa triples normalizados → (location, type).
+
+    Entradas são tuplas ``(loc_dict | None, type | None)`` em vez de dicts —
+    um índice grande cria uma entrada por triple. Triples vindos de chains
+    também são indexados pela forma original (apontando para a mesma entrada),
+    de modo que get_relations acerta sem normalizar ``all_triples``.
+    """
+    index: dict[tuple[str, str, str], tuple[Optional[dict], Optional[str]]] = {}
+    # Chains já visitadas via sources — o fallback costuma reapontar para os
+    # mesmos objetos e pagaria a extração de triple só para descartá-la.
+    seen_chain_ids: set[int] = set()
+    item_locs: dict[int, Optional[dict]] = {}
     sources = getattr(lp, "sources", {}) or {}
     for src in _iter_sources(sources):
         for item in getattr(src, "items", []) or []:
             for chain in getattr(item, "chains", None) or []:
-                _index_chain(index, chain, item, workspace_root)
+                seen_chain_ids.add(id(chain))
+                _index_chain(index, chain, item, workspace_root, item_locs)
 
     # Fallback 1: merge explicit relation index mappings, se existirem
     _merge_relation_index_from_mapping(index, lp, workspace_root)
 
     # Fallback: busca chains em outros índices, se disponíveis
     for chain in _iter_lp_chains(lp):
+        if id(chain) in seen_chain_ids:
+            continue
         _index_chain(index, chain, None, workspace_root)
     return index
 
@@ -1061,8 +1178,6 @@ def _merge_relation_index_from_mapping(index: dict, lp, workspace_root: Optional
             if key in index:
                 continue
 
-            entry = {}
-
             # Try to extract location from value
             loc = None
             if isinstance(value, (list, tuple)) and len(value) >= 4:
@@ -1072,16 +1187,11 @@ def _merge_relation_index_from_mapping(index: dict, lp, workspace_root: Optional
             if not loc:
                 loc = _location_dict(value, workspace_root)
 
-            if loc:
-                entry["location"] = loc
-
             # Try to extract type if available
             chain_type = _extract_chain_type(value)
-            if chain_type:
-                entry["type"] = chain_type
 
-            if entry:
-                index[key] = entry
+            if loc or chain_type:
+                index[key] = (loc, chain_type)
 
 
 def _iter_lp_chains(lp) -> Iterable:
@@ -1099,40 +1209,70 @@ def _iter_lp_chains(lp) -> Iterable:
         yield from _flatten_values(value)
 
 
-def _flatten_values(value, _seen=None) -> Iterable:
-    if _seen is None:
-        _seen = set()
-    obj_id = id(value)
-    if obj_id in _seen:
-        return
-    _seen.add(obj_id)
+def _flatten_values(value) -> Iterable:
+    """
+    Achata containers aninhados em valores folha, em pré-ordem.
 
-    if isinstance(value, dict):
-        for item in value.values():
-            yield from _flatten_values(item, _seen)
-        return
-    if isinstance(value, (list, tuple, set)):
-        for item in value:
-            yield from _flatten_values(item, _seen)
-        return
-    yield value
+    Percurso iterativo com pilha explícita (sem um frame de gerador por
+    nível). Só containers entram no conjunto de visitados — é o que protege
+    contra ciclos; folhas são emitidas direto.
+    """
+    seen: set[int] = set()
+    stack = [value]
+    pop = stack.pop
+    while stack:
+        current = pop()
+        if isinstance(current, (list, tuple)):
+            children = current
+        elif isinstance(current, dict):
+            children = list(current.values())
+        elif isinstance(current, set):
+            children = list(current)
+        else:
+            yield current
+            continue
+        obj_id = id(current)
+        if obj_id in seen:
+            continue
+        seen.add(obj_id)
+        stack.extend(reversed(children))
 
 
-def _index_chain(index: dict, chain, item, workspace_root: Optional[Path]) -> None:
+def _item_location_dict(item, workspace_root: Optional[Path]) -> Optional[dict]:
+    item_loc = getattr(item, "location", None)
+    if not item_loc or not getattr(item_loc, "file", None):
+        source = getattr(item, "source", None)
+        item_loc = getattr(source, "location", None) if source else item_loc
+    if not item_loc:
+        return None
+    return _location_dict(item_loc, workspace_root)
+
+
+def _index_chain(
+    index: dict,
+    chain,
+    item,
+    workspace_root: Optional[Path],
+    item_locs: Optional[dict[int, Optional[dict]]] = None,
+) -> None:
     """
     Index chain with improved location and type extraction.
 
     Location priority: tuple[3] → chain.location → dict["location"] → item.location
     Type: qualified (has type or "::") or simple
+
+    ``item_locs`` memoiza a location do item por ``id(item)`` — items
+    costumam ter várias chains e a location do item não muda entre elas.
     """
-    triple = _extract_chain_triple(chain)
+    triple = extract_chain_triple(chain, nodes=True)
     if not triple:
         return
     key = _normalize_triple(*triple)
     if key in index:
-        return  # Don't overwrite existing (first occurrence wins)
-
-    entry = {}
+        # Don't overwrite existing (first occurrence wins)
+        if triple != key:
+            index.setdefault(triple, index[key])
+        return
 
     # === Extract Location (priority order) ===
     loc = None
@@ -1151,26 +1291,25 @@ def _index_chain(index: dict, chain, item, workspace_root: Optional[Path]) -> No
     if not loc and isinstance(chain, dict) and "location" in chain:
         loc = _location_dict(chain["location"], workspace_root)
 
-    # Priority 4: Use item location as fallback
+    # Priority 4: Use item location as fallback (resolvida uma vez por item)
     if not loc and item is not None:
-        item_loc = getattr(item, "location", None)
-        if not item_loc or not getattr(item_loc, "file", None):
-            source = getattr(item, "source", None)
-            item_loc = getattr(source, "location", None) if source else item_loc
-        if item_loc:
-            loc = _location_dict(item_loc, workspace_root)
-
-    if loc:
-        entry["location"] = loc
+        if item_locs is None:
+            loc = _item_location_dict(item, workspace_root)
+        else:
+            item_id = id(item)
+            if item_id in item_locs:
+                loc = item_locs[item_id]
+            else:
+                loc = item_locs[item_id] = _item_location_dict(item, workspace_root)
 
     # === Extract Type ===
     chain_type = _extract_chain_type(chain)
-    if chain_type:
-        entry["type"] = chain_type
 
     # Only add to index if we have at least one piece of info
-    if entry:
-        index[key] = entry
+    if loc or chain_type:
+        index[key] = (loc, chain_type)
+        if triple != key:
+            index.setdefault(triple, index[key])
 
 
 def get_excerpts(cached_result, bibref: str) -> dict:
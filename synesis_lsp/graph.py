@@ -15,17 +15,62 @@ Notas de implementação:
 from __future__ import annotations
 
 import logging
-import re
+import string
+import sys
+import weakref
+from array import array
+from functools import lru_cache
 from typing import Iterable, Optional
 
-from synesis.ast.normalize import normalize_code as _normalize_code
+from synesis.ast.normalize import normalize_code
+
+from synesis_lsp._chains import extract_chain_triple
 
 logger = logging.getLogger(__name__)
 
+# Strings maiores que isso não são internadas (raramente se repetem e
+# ficariam presas na tabela de interning do interpretador).
+_INTERN_MAX_LEN = 256
+
+# Limite por id para empacotar (subj, rel, obj) em um int de 63 bits.
+_PACK_LIMIT = 1 << 21
+
+# Índices memoizados por LinkedProject (id → (weakref, índice)); ver _lp_memo
+_USAGE_BIBREF_INDEX: dict[int, tuple[weakref.ref, dict[str, frozenset[str]]]] = {}
+_SOURCE_CODES: dict[int, tuple[weakref.ref, dict[str, frozenset[str]]]] = {}
+_ONTOLOGY_CODES: dict[int, tuple[weakref.ref, frozenset[str]]] = {}
+_TRIPLE_POSTINGS: dict[int, tuple[weakref.ref, dict[str, array]]] = {}
+_LP_MEMO_MAX = 4
+
+_MISSING = object()
+
+
+def _intern(value: str) -> str:
+    return sys.intern(value) if len(value) < _INTERN_MAX_LEN else value
+
+
+@lru_cache(maxsize=8192)
+def _normalize_code(value: str) -> str:
+    return _intern(normalize_code(value))
+
 
+class _SanitizeTable(dict):
+    """Tabela para str.translate: qualquer caractere fora de [a-zA-Z0-9_] vira '_'."""
+
+    def __missing__(self, key: int) -> int:
+        return _UNDERSCORE
+
+
+_UNDERSCORE = ord("_")
+_SANITIZE_TABLE = _SanitizeTable(
+    (ord(c), ord(c)) for c in string.ascii_letters + string.digits + "_"
+)
+
+
+@lru_cache(maxsize=8192)
 def _sanitize_id(name: str) -> str:
     """Sanitiza nome para uso como ID de nó Mermaid.js."""
-    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+    return name.translate(_SANITIZE_TABLE)
 
 
 def get_relation_graph(
@@ -97,15 +142,7 @@ def get_relation_graph(
         return {"success": True, "mermaidCode": "graph LR\n    empty[Sem relações]"}
 
     lines = ["graph LR"]
-    seen = set()
-    for subj, rel, obj in triples:
-        key = (subj, rel, obj)
-        if key in seen:
-            continue
-        seen.add(key)
-        s_id = _sanitize_id(subj)
-        o_id = _sanitize_id(obj)
-        lines.append(f"    {s_id}[{subj}] -->|{rel}| {o_id}[{obj}]")
+    _append_edge_lines(lines, triples)
 
     mermaid_code = "\n".join(lines)
     logger.debug(f"get_relation_graph: Generated {len(lines)-1} edges")
@@ -113,6 +150,49 @@ def get_relation_graph(
     return {"success": True, "mermaidCode": mermaid_code}
 
 
+def _append_edge_lines(lines: list[str], triples: Iterable) -> None:
+    """
+    Deduplica as triples e anexa uma linha Mermaid por aresta.
+
+    Laço quente do grafo: métodos e constantes ficam em variáveis locais para
+    evitar lookups de atributo/global por triple.
+    """
+    # Dicionário de strings → ids inteiros: o dedup compara ints em vez de
+    # re-hashear três strings por triple.
+    ids: dict[str, int] = {}
+    intern_id = ids.setdefault
+    seen: set = set()
+    seen_add = seen.add
+    # nó → fragmento Mermaid "id[rótulo]", montado uma vez por nó (não por aresta)
+    node_refs: dict[str, str] = {}
+    node_ref = node_refs.get
+    sanitize = _sanitize_id
+    append = lines.append
+    edge = "    {} -->|{}| {}".format
+    limit = _PACK_LIMIT
+    for subj, rel, obj in triples:
+        s_n = intern_id(subj, len(ids))
+        r_n = intern_id(rel, len(ids))
+        o_n = intern_id(obj, len(ids))
+        # Com ids < 2**21 o triple cabe num único int de 63 bits; acima disso
+        # (improvável) cai para a tupla. A forma da chave depende só dos ids do
+        # triple, então o mesmo triple sempre gera a mesma chave.
+        if s_n < limit and r_n < limit and o_n < limit:
+            key = (s_n << 42) | (r_n << 21) | o_n
+        else:
+            key = (s_n, r_n, o_n)
+        if key in seen:
+            continue
+        seen_add(key)
+        s_ref = node_ref(subj)
+        if s_ref is None:
+            s_ref = node_refs[subj] = f"{sanitize(subj)}[{subj}]"
+        o_ref = node_ref(obj)
+        if o_ref is None:
+            o_ref = node_refs[obj] = f"{sanitize(obj)}[{obj}]"
+        append(edge(s_ref, rel, o_ref))
+
+
 def _has_chain_relations(template) -> bool:
     if not template:
         return False
@@ -123,8 +203,9 @@ def _has_chain_relations(template) -> bool:
     return False
 
 
+@lru_cache(maxsize=8192)
 def _normalize_bibref(value: str) -> str:
-    return value.lstrip("@").strip().lower()
+    return _intern(value.lstrip("@").strip().lower())
 
 
 def _find_source_by_bibref(lp, bibref: str):
@@ -245,9 +326,15 @@ def _triples_for_item(
     sources = getattr(lp, "sources", {}) or {}
     items_iter = sources.values() if isinstance(sources, dict) else sources
 
+    # ITEMs costumam repetir o mesmo bibref: normaliza cada valor uma vez
+    bibref_keys: dict[str, str] = {}
     for src in items_iter:
         for item in getattr(src, "items", None) or []:
-            if _normalize_bibref(getattr(item, "bibref", "") or "") != normalized:
+            raw_bibref = getattr(item, "bibref", "") or ""
+            item_key = bibref_keys.get(raw_bibref)
+            if item_key is None:
+                item_key = bibref_keys[raw_bibref] = _normalize_bibref(raw_bibref)
+            if item_key != normalized:
                 continue
 
             loc = getattr(item, "location", None)
@@ -316,109 +403,167 @@ def _triples_for_bibref(lp, template, bibref: str) -> list[tuple[str, str, str]]
     if not relevant:
         return []
 
-    triples = []
-    for subj, rel, obj in getattr(lp, "all_triples", None) or []:
-        if _normalize_code(subj) in relevant or _normalize_code(obj) in relevant:
-            triples.append((subj, rel, obj))
+    all_triples = getattr(lp, "all_triples", None) or []
+    postings = _lp_memo(_TRIPLE_POSTINGS, lp, _build_triple_postings)
+    positions: set[int] = set()
+    add_positions = positions.update
+    for hits in map(postings.get, relevant):
+        if hits is not None:
+            add_positions(hits)
 
-    return triples
+    return [tuple(all_triples[i]) for i in sorted(positions)]
 
 
-def _extract_chain_triple(chain) -> Optional[tuple[str, str, str]]:
-    if isinstance(chain, (list, tuple)) and len(chain) >= 3:
-        subj, rel, obj = chain[0], chain[1], chain[2]
-        if isinstance(subj, str) and isinstance(rel, str) and isinstance(obj, str):
-            return subj, rel, obj
-
-    if isinstance(chain, dict):
-        for keys in (("from", "relation", "to"), ("subject", "relation", "object")):
-            if all(k in chain for k in keys):
-                subj, rel, obj = chain[keys[0]], chain[keys[1]], chain[keys[2]]
-                if isinstance(subj, str) and isinstance(rel, str) and isinstance(obj, str):
-                    return subj, rel, obj
-
-    nodes = getattr(chain, "nodes", None)
-    if isinstance(nodes, (list, tuple)) and len(nodes) >= 3:
-        subj, rel, obj = nodes[0], nodes[1], nodes[2]
-        if isinstance(subj, str) and isinstance(rel, str) and isinstance(obj, str):
-            return subj, rel, obj
-
-    return None
-
+def _build_triple_postings(lp) -> dict[str, array]:
+    """
+    Código normalizado → posições (em all_triples) das triples onde ele é
+    subject ou object.
 
-def _codes_for_bibref(lp, bibref: str) -> set[str]:
+    Cada nó distinto é normalizado uma única vez; as posições ficam em
+    ``array('I')`` contíguos em vez de listas de ints.
+    """
+    all_triples = getattr(lp, "all_triples", None) or []
+    normalized: dict[str, str] = {}
+    normalized_get = normalized.get
+    normalize = _normalize_code
+    postings: dict[str, array] = {}
+    postings_get = postings.get
+    for position, (subj, _rel, obj) in enumerate(all_triples):
+        for node in (subj, obj) if subj != obj else (subj,):
+            code = normalized_get(node)
+            if code is None:
+                code = normalized[node] = normalize(node)
+            hits = postings_get(code)
+            if hits is None:
+                hits = postings[code] = array("I")
+            # subj e obj distintos podem normalizar para o mesmo código
+            if not hits or hits[-1] != position:
+                hits.append(position)
+    return postings
+
+
+def _codes_for_bibref(lp, bibref: str) -> frozenset[str]:
     """
     Find all codes used by items that reference the given bibref.
 
     Uses enhanced _item_bibref() with more fallback strategies.
     Stage 2 uses _iter_codes_from_item_all() without ontology filter.
+    Both stages are memoized per LinkedProject.
     """
     normalized = _normalize_bibref(bibref)
     if not normalized:
-        return set()
-
-    relevant: set[str] = set()
+        return frozenset()
 
     # Stage 1: Try code_usage (with enhanced _item_bibref)
-    code_usage = getattr(lp, "code_usage", {}) or {}
-    if code_usage:
-        for code, items in code_usage.items():
-            for item in _iter_items(items):
-                item_bibref = _item_bibref(item)  # Now has more fallbacks
-                if not item_bibref:
-                    continue
-                if _normalize_bibref(item_bibref) == normalized:
-                    relevant.add(_normalize_code(code))
-                    break  # Found match, move to next code
-
-    # If stage 1 found codes, return early
+    relevant = _lp_memo(_USAGE_BIBREF_INDEX, lp, _build_usage_bibref_index).get(normalized)
     if relevant:
         logger.debug(f"_codes_for_bibref: Stage 1 found {len(relevant)} codes via code_usage")
         return relevant
 
-    # Stage 2: Fallback to sources iteration (use _iter_codes_from_item_all)
-    ontology_codes = {
-        _normalize_code(code) for code in getattr(lp, "ontology_index", {}) or {}
-    }
-    sources = getattr(lp, "sources", {}) or {}
-    for src in _iter_sources(sources):
-        src_bibref = getattr(src, "bibref", None)
-        if not src_bibref:
-            continue
+    # Stage 2: Fallback to the SOURCE's items (use _iter_codes_from_item_all).
+    # _find_source_by_bibref indexa sources direto pelo bibref; o resultado
+    # fica memoizado por (LinkedProject, bibref).
+    source_codes = _lp_memo(_SOURCE_CODES, lp, _new_memo)
+    relevant = source_codes.get(normalized)
+    if relevant is None:
+        relevant = source_codes[normalized] = _codes_for_source(
+            lp, _find_source_by_bibref(lp, bibref)
+        )
+    if relevant:
+        logger.debug(f"_codes_for_bibref: Stage 2 found {len(relevant)} codes via sources")
+    return relevant
 
-        # Check if source matches bibref
-        if _normalize_bibref(str(src_bibref)) != normalized:
-            continue
 
-        # Extract ALL codes from items in this source (no ontology filter)
-        for item in getattr(src, "items", []) or []:
-            for code in _iter_codes_from_item_all(item, ontology_codes=ontology_codes):
-                relevant.add(_normalize_code(code))
+def _lp_memo(cache: dict, lp, build):
+    """
+    Resultado de ``build(lp)`` memoizado por LinkedProject.
 
-    if relevant:
-        logger.debug(f"_codes_for_bibref: Stage 2 found {len(relevant)} codes via sources")
+    A chave é ``id(lp)`` validada por weakref: uma recompilação gera outro
+    LinkedProject, então o índice antigo nunca é reaproveitado.
+    """
+    lp_id = id(lp)
+    cached = cache.get(lp_id)
+    if cached is not None:
+        lp_ref, value = cached
+        if lp_ref() is lp:
+            return value
+
+    value = build(lp)
+    try:
+        lp_ref = weakref.ref(lp)
+    except TypeError:
+        return value
+    cache[lp_id] = (lp_ref, value)
+    while len(cache) > _LP_MEMO_MAX:
+        cache.pop(next(iter(cache)))
+    return value
+
+
+def _build_usage_bibref_index(lp) -> dict[str, frozenset[str]]:
+    """bibref normalizado → códigos normalizados, a partir de code_usage."""
+    index: dict[str, set[str]] = {}
+    bibref_keys: dict[str, str] = {}
+    code_usage = getattr(lp, "code_usage", {}) or {}
+    for code, items in code_usage.items():
+        normalized_code = None
+        for item in _iter_items(items):
+            item_bibref = _item_bibref(item)  # Now has more fallbacks
+            if not item_bibref:
+                continue
+            if normalized_code is None:
+                normalized_code = _normalize_code(code)
+            bibref_key = bibref_keys.get(item_bibref)
+            if bibref_key is None:
+                bibref_key = bibref_keys[item_bibref] = _normalize_bibref(item_bibref)
+            index.setdefault(bibref_key, set()).add(normalized_code)
+    return {key: frozenset(codes) for key, codes in index.items()}
 
-    return relevant
 
+def _new_memo(_lp) -> dict:
+    return {}
 
-def _iter_sources(sources) -> Iterable:
-    if isinstance(sources, dict):
-        yield from sources.values()
-        return
-    if isinstance(sources, (list, tuple, set)):
-        yield from sources
-        return
+
+def _build_ontology_codes(lp) -> frozenset[str]:
+    return frozenset(
+        _normalize_code(code) for code in getattr(lp, "ontology_index", {}) or {}
+    )
+
+
+def _codes_for_source(lp, source) -> frozenset[str]:
+    """Todos os códigos dos ITEMs do SOURCE (sem filtro de ontologia)."""
+    if source is None:
+        return frozenset()
+    ontology_codes = _lp_memo(_ONTOLOGY_CODES, lp, _build_ontology_codes)
+    # Os chains ficam vivos (referenciados por lp) durante toda a varredura,
+    # então id(chain) é estável como chave.
+    extract_cache: dict[int, Optional[tuple[str, str, str]]] = {}
+    code_keys: dict[str, str] = {}
+    codes: set[str] = set()
+    # Extract ALL codes from items in this source (no ontology filter)
+    for item in getattr(source, "items", []) or []:
+        for code in _iter_codes_from_item_all(
+            item, ontology_codes=ontology_codes, extract_cache=extract_cache
+        ):
+            code_key = code_keys.get(code)
+            if code_key is None:
+                code_key = code_keys[code] = _normalize_code(code)
+            codes.add(code_key)
+    return frozenset(codes)
 
 
 def _iter_items(items) -> Iterable:
+    # Devolve o próprio container (ou uma view) em vez de um gerador:
+    # o chamador itera direto, sem um frame extra por elemento.
+    items_type = type(items)
+    if items_type is list or items_type is tuple:
+        return items
     if isinstance(items, dict):
-        yield from items.values()
-        return
+        return items.values()
     if isinstance(items, (list, tuple, set)):
-        yield from items
-        return
+        return items
     if items is not None:
-        yield items
+        return (items,)
+    return ()
 
 
 def _item_bibref(item) -> Optional[str]:
@@ -466,7 +611,11 @@ def _iter_string_values(value) -> Iterable[str]:
             yield from _iter_string_values(item)
 
 
-def _iter_codes_from_item(item, ontology_codes: set[str]) -> Iterable[str]:
+def _iter_codes_from_item(
+    item,
+    ontology_codes: set[str],
+    extract_cache: Optional[dict] = None,
+) -> Iterable[str]:
     codes = getattr(item, "codes", None) or []
     for code in codes:
         if isinstance(code, str) and code.strip():
@@ -474,7 +623,7 @@ def _iter_codes_from_item(item, ontology_codes: set[str]) -> Iterable[str]:
 
     chains = getattr(item, "chains", None) or []
     for chain in chains:
-        triple = _extract_chain_triple(chain)
+        triple = _cached_chain_triple(chain, extract_cache)
         if not triple:
             continue
         subj, _rel, obj = triple
@@ -493,7 +642,8 @@ def _iter_codes_from_item(item, ontology_codes: set[str]) -> Iterable[str]:
 
 def _iter_codes_from_item_all(
     item,
-    ontology_codes: Optional[set[str]] = None
+    ontology_codes: Optional[set[str]] = None,
+    extract_cache: Optional[dict] = None,
 ) -> Iterable[str]:
     """
     Extract ALL codes from item without ontology filtering.
@@ -501,6 +651,8 @@ def _iter_codes_from_item_all(
     Enhancement over _iter_codes_from_item():
         - No ontology_codes filter (extracts all codes)
         - Used for bibref filtering fallback
+        - extract_cache (id(chain) → triple) shared across items avoids
+          re-extracting chains that appear in both chains and extra_fields
     """
     # Extract from codes list
     codes = getattr(item, "codes", None) or []
@@ -524,7 +676,7 @@ def _iter_codes_from_item_all(
                     yield node
             continue
 
-        triple = _extract_chain_triple(chain)
+        triple = _cached_chain_triple(chain, extract_cache)
         if not triple:
             continue
         subj, _rel, obj = triple
@@ -538,7 +690,7 @@ def _iter_codes_from_item_all(
     for value in extra_fields.values():
         # Try chains first
         for candidate in _iter_chain_values(value):
-            triple = _extract_chain_triple(candidate)
+            triple = _cached_chain_triple(candidate, extract_cache)
             if triple:
                 subj, _rel, obj = triple
                 if isinstance(subj, str) and subj.strip():
@@ -553,6 +705,17 @@ def _iter_codes_from_item_all(
                 yield code
 
 
+def _cached_chain_triple(chain, extract_cache: Optional[dict]) -> Optional[tuple[str, str, str]]:
+    """_extract_chain_triple memoizado por identidade do chain (cache por varredura)."""
+    if extract_cache is None:
+        return _extract_chain_triple(chain)
+    key = id(chain)
+    triple = extract_cache.get(key, _MISSING)
+    if triple is _MISSING:
+        triple = extract_cache[key] = _extract_chain_triple(chain)
+    return triple
+
+
 def _iter_chain_values(value) -> Iterable:
     """Iterator for chain objects in nested structures."""
     if isinstance(value, (list, tuple, set)):
@@ -567,31 +730,9 @@ def _iter_chain_values(value) -> Iterable:
 
 
 def _extract_chain_triple(chain) -> Optional[tuple[str, str, str]]:
-    if isinstance(chain, (list, tuple)) and len(chain) >= 3:
-        subj, rel, obj = chain[0], chain[1], chain[2]
-        if isinstance(subj, str) and isinstance(rel, str) and isinstance(obj, str):
-            return subj, rel, obj
-
-    if isinstance(chain, dict):
-        for keys in (("from", "relation", "to"), ("subject", "relation", "object")):
-            if all(k in chain for k in keys):
-                subj, rel, obj = chain[keys[0]], chain[keys[1]], chain[keys[2]]
-                if isinstance(subj, str) and isinstance(rel, str) and isinstance(obj, str):
-                    return subj, rel, obj
-
-    candidates = [
-        ("from_code", "relation", "to_code"),
-        ("source", "relation", "target"),
-        ("subject", "relation", "object"),
-        ("subj", "rel", "obj"),
-        ("from", "relation", "to"),
-        ("left", "relation", "right"),
-    ]
-    for subj_key, rel_key, obj_key in candidates:
-        subj = getattr(chain, subj_key, None)
-        rel = getattr(chain, rel_key, None)
-        obj = getattr(chain, obj_key, None)
-        if isinstance(subj, str) and isinstance(rel, str) and isinstance(obj, str):
-            return subj, rel, obj
-
-    return None
+    """extract_chain_triple com subject/relation/object internados."""
+    triple = extract_chain_triple(chain)
+    if triple is None:
+        return None
+    subj, rel, obj = triple
+    return _intern(subj), _intern(rel), _intern(obj)
@@ -22,20 +22,56 @@ from __future__ import annotations
 
 import logging
 import re
+import string
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Optional
 
 from lsprotocol.types import Hover, MarkupContent, MarkupKind, Position
-from synesis.ast.normalize import normalize_code as _normalize_code
+from synesis.ast.normalize import normalize_code
+
+from synesis_lsp.cache import get_document_lines
 
 logger = logging.getLogger(__name__)
 
+# Memoizado: o hover de código normaliza a mesma palavra a cada passagem do mouse
+_normalize_code = lru_cache(maxsize=8192)(normalize_code)
+
 # Caracteres válidos em palavras Synesis (bibrefs, campos, códigos)
 # Inclui hífen e ponto para bibrefs compostos (ex: @martinez-gordon2022)
 _WORD_CHARS = re.compile(r"[@\w._-]")
+# Sequência de caracteres de palavra a partir de uma posição (expansão à direita em C)
+_WORD_RUN = re.compile(r"[@\w._-]*")
+# Caracteres de palavra ASCII; não-ASCII (ex.: letras acentuadas) caem no regex
+_WORD_ASCII = frozenset("@._-" + string.ascii_letters + string.digits + "_")
+# Prefixo 'campo:' de uma linha; o fim do match é o início do valor
+# (sem capturar o resto da linha)
+_FIELD_LINE_RE = re.compile(r"\s*([\w._-]+)\s*:\s*")
+
+# LRU de resultados de hover: hovers repetidos no mesmo ponto (padrão comum
+# ao mover o mouse) não refazem split/regex/busca nos índices do projeto.
+_HOVER_CACHE: OrderedDict[tuple, Optional[Hover]] = OrderedDict()
+_HOVER_CACHE_MAX = 500
+
+# Índices derivados de field_specs, memoizados por compilação:
+# id(field_specs) → (field_specs, len, índice); ver _memo_by_field_specs
+_FIELD_SPEC_INDEX: dict[int, tuple[dict, int, dict]] = {}
+_BLOCKS_INDEX: dict[int, tuple[dict, int, dict]] = {}
+_RELATIONS_INDEX: dict[int, tuple[dict, int, dict]] = {}
+_SPEC_TYPES: dict[int, tuple[dict, int, dict]] = {}
+_FIELD_SPEC_INDEX_MAX = 4
+
+# id(nó de ontologia) → (nó, campos renderizados); ver _render_onto_fields
+_ONTO_RENDER: dict[int, tuple[object, str]] = {}
+_ONTO_RENDER_MAX = 2048
 
 
 def compute_hover(
-    source: str, position: Position, cached_result
+    source: str,
+    position: Position,
+    cached_result,
+    uri: Optional[str] = None,
+    version: Optional[int] = None,
 ) -> Optional[Hover]:
     """
     Computa hover baseado na posição do cursor.
@@ -44,11 +80,53 @@ def compute_hover(
         source: Texto-fonte do documento
         position: Posição do cursor (0-based)
         cached_result: CachedCompilation do workspace_cache (pode ser None)
+        uri: URI do documento; quando informado, o resultado vai para o LRU
+        version: Versão do documento (na ausência, a chave usa o próprio texto)
 
     Returns:
         Hover com MarkupContent ou None se nada encontrado
     """
-    lines = source.splitlines()
+    if uri is None:
+        return _compute_hover(source, position, cached_result)
+
+    key = (
+        uri,
+        # Sem versão, o texto entra na chave: comparação exata, e o hash
+        # do str já fica cacheado no objeto
+        version if version is not None else source,
+        position.line,
+        position.character,
+        id(cached_result),
+        getattr(cached_result, "timestamp", None),
+    )
+    try:
+        hover = _HOVER_CACHE[key]
+    except KeyError:
+        pass
+    else:
+        _HOVER_CACHE.move_to_end(key)
+        return hover
+
+    hover = _compute_hover(source, position, cached_result, uri)
+    _HOVER_CACHE[key] = hover
+    if len(_HOVER_CACHE) > _HOVER_CACHE_MAX:
+        _HOVER_CACHE.popitem(last=False)
+    return hover
+
+
+def clear_hover_cache(uri: Optional[str] = None) -> None:
+    """Descarta hovers memoizados de um documento (ou de todos, se uri=None)."""
+    if uri is None:
+        _HOVER_CACHE.clear()
+        return
+    for key in [key for key in _HOVER_CACHE if key[0] == uri]:
+        del _HOVER_CACHE[key]
+
+
+def _compute_hover(
+    source: str, position: Position, cached_result, uri: Optional[str] = None
+) -> Optional[Hover]:
+    lines = get_document_lines(uri, source)
     if position.line >= len(lines):
         return None
 
@@ -64,27 +142,34 @@ def compute_hover(
     if not cached_result:
         return None
 
+    # template/field_specs resolvidos uma vez e repassados aos _hover_*
     result = cached_result.result
     template = getattr(result, "template", None)
     field_specs = getattr(template, "field_specs", None) if template else None
 
     field_name, value_start = _field_in_line(line)
     in_value = field_name is not None and position.character >= value_start
-    spec = _find_field_spec(field_specs, field_name) if field_name else None
-    spec_type = getattr(getattr(spec, "type", None), "name", None) if spec else None
+    # Tipo do campo só interessa para hover em valores
+    spec_type = None
+    if in_value:
+        spec = _find_field_spec(field_specs, field_name)
+        if spec is not None:
+            spec_type = _memo_by_field_specs(
+                _SPEC_TYPES, field_specs, _build_spec_types
+            ).get(id(spec))
 
     # Hover em nome de campo (qualquer tipo)
     if _is_field_name(line, position.character, word):
-        return _hover_field(word, cached_result)
+        return _hover_field(word, field_specs)
 
-    block_hover = _hover_block(word, cached_result)
+    block_hover = _hover_block(word, field_specs)
     if block_hover:
         return block_hover
 
     # Hover em valores apenas para CODE/CHAIN conforme template
     if spec_type in {"CODE", "CHAIN"} and in_value:
         if spec_type == "CHAIN":
-            rel_hover = _hover_relation(word, cached_result)
+            rel_hover = _hover_relation(word, field_specs)
             if rel_hover:
                 return rel_hover
         return _hover_code(word, cached_result)
@@ -105,8 +190,11 @@ def _hover_bibref(word: str, cached_result) -> Optional[Hover]:
     # Remove @ para buscar na bibliografia
     bibref = word[1:]
 
-    # Tenta busca direta e normalizada (lowercase)
-    entry = bibliography.get(bibref) or bibliography.get(bibref.lower())
+    # Tenta busca direta e normalizada (lowercase); a segunda só quando
+    # o bibref tem maiúsculas
+    entry = bibliography.get(bibref)
+    if not entry and not bibref.islower():
+        entry = bibliography.get(bibref.lower())
     if not entry:
         return None
 
@@ -115,24 +203,13 @@ def _hover_bibref(word: str, cached_result) -> Optional[Hover]:
     year = entry.get("year", "N/A")
     entry_type = entry.get("ENTRYTYPE", "N/A")
 
-    md = f"**{title}**\n\n"
-    md += f"*{author}* ({year})\n\n"
-    md += f"Type: `{entry_type}`"
+    md = f"**{title}**\n\n*{author}* ({year})\n\nType: `{entry_type}`"
 
     return Hover(contents=MarkupContent(kind=MarkupKind.Markdown, value=md))
 
 
-def _hover_field(word: str, cached_result) -> Optional[Hover]:
+def _hover_field(word: str, field_specs) -> Optional[Hover]:
     """Hover para campo: mostra especificação do template."""
-    if not cached_result:
-        return None
-
-    result = cached_result.result
-    template = getattr(result, "template", None)
-    if not template:
-        return None
-
-    field_specs = getattr(template, "field_specs", None)
     if not field_specs:
         return None
 
@@ -140,11 +217,14 @@ def _hover_field(word: str, cached_result) -> Optional[Hover]:
     if not spec:
         return None
 
-    md = f"**Campo: `{spec.name}`**\n\n"
-    md += f"- Tipo: `{spec.type.name}`\n"
-    md += f"- Escopo: `{spec.scope.name}`\n"
+    parts = [
+        f"**Campo: `{spec.name}`**\n\n",
+        f"- Tipo: `{spec.type.name}`\n",
+        f"- Escopo: `{spec.scope.name}`\n",
+    ]
     if spec.description:
-        md += f"- Descrição: {spec.description}\n"
+        parts.append(f"- Descrição: {spec.description}\n")
+    md = "".join(parts)
 
     return Hover(contents=MarkupContent(kind=MarkupKind.Markdown, value=md))
 
@@ -164,55 +244,80 @@ def _hover_code(word: str, cached_result) -> Optional[Hover]:
         return None
 
     normalized = _normalize_code(word)
-    onto = ontology_index.get(word) or ontology_index.get(normalized)
+    onto = ontology_index.get(word)
+    if not onto and normalized != word:
+        onto = ontology_index.get(normalized)
     if not onto:
         return None
 
     code_usage = getattr(lp, "code_usage", {})
-    usage_count = len(code_usage.get(normalized, code_usage.get(word, [])))
+    usage = code_usage.get(normalized)
+    if usage is None:
+        usage = code_usage.get(word, [])
+    usage_count = len(usage)
 
-    md = f"**Ontologia: `{onto.concept}`**\n\n"
+    parts = [f"**Ontologia: `{onto.concept}`**\n\n"]
     if onto.description:
-        md += f"{onto.description}\n\n"
+        parts.append(f"{onto.description}\n\n")
 
-    fields = getattr(onto, "fields", {})
-    for k, v in fields.items():
-        # Trunca valores longos
-        val = str(v)[:80]
-        md += f"- {k}: {val}\n"
+    parts.append(_render_onto_fields(onto))
 
-    md += f"\nUsado em **{usage_count}** itens"
+    parts.append(f"\nUsado em **{usage_count}** itens")
+    md = "".join(parts)
 
     return Hover(contents=MarkupContent(kind=MarkupKind.Markdown, value=md))
 
 
-def _hover_relation(word: str, cached_result) -> Optional[Hover]:
+def _render_onto_fields(onto) -> str:
+    """
+    Lista de campos do conceito em Markdown (valores truncados), memoizada
+    por nó de ontologia. A entrada guarda o próprio nó para validar o id.
+    """
+    cached = _ONTO_RENDER.get(id(onto))
+    if cached is not None and cached[0] is onto:
+        return cached[1]
+    fields = getattr(onto, "fields", {})
+    # Trunca valores longos
+    rendered = "".join(f"- {k}: {str(v)[:80]}\n" for k, v in fields.items())
+    _ONTO_RENDER[id(onto)] = (onto, rendered)
+    if len(_ONTO_RENDER) > _ONTO_RENDER_MAX:
+        _ONTO_RENDER.pop(next(iter(_ONTO_RENDER)))
+    return rendered
+
+
+def clear_render_cache() -> None:
+    """Descarta renderizações de ontologia (chamado a cada nova compilação)."""
+    _ONTO_RENDER.clear()
+
+
+def _hover_relation(word: str, field_specs) -> Optional[Hover]:
     """Hover para relações de CHAIN (ex: ENABLES, INFLUENCES)."""
-    if not cached_result:
+    if not field_specs:
         return None
 
-    result = cached_result.result
-    template = getattr(result, "template", None)
-    if not template:
+    hit = _memo_by_field_specs(_RELATIONS_INDEX, field_specs, _build_relations_index).get(
+        word.strip().lower()
+    )
+    if hit is None:
         return None
 
-    field_specs = getattr(template, "field_specs", None)
-    if not field_specs:
-        return None
+    key, description = hit
+    md = f"**Relação: `{key}`**\n\n"
+    if description:
+        md = f"{md}{description}\n"
+    return Hover(contents=MarkupContent(kind=MarkupKind.Markdown, value=md))
 
-    target = word.strip().lower()
+
+def _build_relations_index(field_specs) -> dict[str, tuple]:
+    """Relação normalizada → (nome declarado, descrição); primeira ocorrência vence."""
+    index: dict[str, tuple] = {}
     for spec in field_specs.values():
         relations = getattr(spec, "relations", None)
         if not relations:
             continue
         for key, description in relations.items():
-            if str(key).strip().lower() == target:
-                md = f"**Relação: `{key}`**\n\n"
-                if description:
-                    md += f"{description}\n"
-                return Hover(contents=MarkupContent(kind=MarkupKind.Markdown, value=md))
-
-    return None
+            index.setdefault(str(key).strip().lower(), (key, description))
+    return index
 
 
 def _find_field_spec(field_specs, name: Optional[str]):
@@ -221,49 +326,83 @@ def _find_field_spec(field_specs, name: Optional[str]):
     spec = field_specs.get(name)
     if spec:
         return spec
-    lowered = str(name).lower()
+    return _field_spec_lower_index(field_specs).get(str(name).lower())
+
+
+def _field_spec_lower_index(field_specs) -> dict:
+    """Índice ``nome.lower() → spec`` (primeira ocorrência vence)."""
+    return _memo_by_field_specs(_FIELD_SPEC_INDEX, field_specs, _build_lower_index)
+
+
+def _build_lower_index(field_specs) -> dict:
+    index: dict = {}
     for key, value in field_specs.items():
-        if str(key).lower() == lowered:
-            return value
-    return None
+        index.setdefault(str(key).lower(), value)
+    return index
 
 
-def _hover_block(word: str, cached_result) -> Optional[Hover]:
-    if not cached_result:
-        return None
+def _memo_by_field_specs(cache: dict, field_specs, build):
+    """
+    ``build(field_specs)`` memoizado por dict de field_specs (um por compilação).
 
-    block = word.strip().upper()
-    if block not in {"SOURCE", "ITEM", "ONTOLOGY"}:
-        return None
+    A entrada guarda o próprio dict (não só o id) para que o id não seja
+    reaproveitado por outro objeto enquanto estiver no cache.
+    """
+    cached = cache.get(id(field_specs))
+    if cached is not None and cached[0] is field_specs and cached[1] == len(field_specs):
+        return cached[2]
+    value = build(field_specs)
+    cache[id(field_specs)] = (field_specs, len(field_specs), value)
+    while len(cache) > _FIELD_SPEC_INDEX_MAX:
+        cache.pop(next(iter(cache)))
+    return value
+
+
+def _build_spec_types(field_specs) -> dict[int, str]:
+    """id(spec) → nome do tipo (CODE, CHAIN, ...), resolvido uma vez por compilação."""
+    types: dict[int, str] = {}
+    for spec in field_specs.values():
+        type_name = getattr(getattr(spec, "type", None), "name", None)
+        if type_name is not None:
+            types[id(spec)] = type_name
+    return types
 
-    result = cached_result.result
-    template = getattr(result, "template", None)
-    field_specs = getattr(template, "field_specs", None) if template else None
-    if not field_specs:
-        return None
 
-    fields = []
+def _build_blocks_index(field_specs) -> dict[str, list]:
+    """Bloco (SOURCE/ITEM/ONTOLOGY/...) → specs do escopo, ordenados por nome."""
+    blocks: dict[str, list] = {}
     for spec in field_specs.values():
         scope = getattr(spec, "scope", None)
         scope_name = getattr(scope, "name", None) or str(scope or "")
         scope_name = scope_name.split(".")[-1].upper()
-        if scope_name == block:
-            fields.append(spec)
+        blocks.setdefault(scope_name, []).append(spec)
+    for fields in blocks.values():
+        fields.sort(key=lambda entry: str(entry.name).lower())
+    return blocks
 
+
+def _hover_block(word: str, field_specs) -> Optional[Hover]:
+    if not field_specs:
+        return None
+
+    block = word.strip().upper()
+    if block not in {"SOURCE", "ITEM", "ONTOLOGY"}:
+        return None
+
+    fields = _memo_by_field_specs(_BLOCKS_INDEX, field_specs, _build_blocks_index).get(block)
     if not fields:
         return None
 
-    fields.sort(key=lambda entry: str(entry.name).lower())
     preview = fields[:10]
 
-    md = f"**Bloco {block}**\n\n"
-    md += f"Campos definidos ({len(fields)}):\n"
+    parts = [f"**Bloco {block}**\n\n", f"Campos definidos ({len(fields)}):\n"]
     for spec in preview:
         type_name = getattr(spec.type, "name", str(spec.type))
-        md += f"- `{spec.name}` ({type_name})\n"
+        parts.append(f"- `{spec.name}` ({type_name})\n")
 
     if len(fields) > len(preview):
-        md += f"... e mais {len(fields) - len(preview)} campos"
+        parts.append(f"... e mais {len(fields) - len(preview)} campos")
+    md = "".join(parts)
 
     return Hover(contents=MarkupContent(kind=MarkupKind.Markdown, value=md))
 
@@ -278,19 +417,23 @@ def _get_word_at_position(line: str, character: int) -> Optional[str]:
     if character >= len(line):
         return None
 
-    # Verifica se o cursor está sobre um caractere válido
-    if not _WORD_CHARS.match(line[character]):
+    # Verifica se o cursor está sobre um caractere válido. Espaços e
+    # pontuação ASCII (maioria dos hovers) são rejeitados sem regex.
+    ch = line[character]
+    if ch not in _WORD_ASCII and (ch < "\x80" or not _WORD_CHARS.match(ch)):
         return None
 
     # Expande para a esquerda
     start = character
-    while start > 0 and _WORD_CHARS.match(line[start - 1]):
-        start -= 1
+    while start > 0:
+        ch = line[start - 1]
+        if ch in _WORD_ASCII or (ch > "\x7f" and _WORD_CHARS.match(ch)):
+            start -= 1
+        else:
+            break
 
     # Expande para a direita
-    end = character
-    while end < len(line) and _WORD_CHARS.match(line[end]):
-        end += 1
+    end = _WORD_RUN.match(line, character).end()
 
     word = line[start:end]
     return word if word else None
@@ -301,12 +444,13 @@ def _field_in_line(line: str) -> tuple[Optional[str], int]:
     Retorna (field_name, value_start_index) se a linha contém 'field: value'.
     Caso contrário, retorna (None, 0).
     """
-    match = re.match(r"^(\s*)([\w._-]+)(\s*:)\s*(.*)$", line)
+    # A maioria das linhas não tem ':'; evita o regex por completo
+    if ":" not in line:
+        return (None, 0)
+    match = _FIELD_LINE_RE.match(line)
     if not match:
         return (None, 0)
-    field_name = match.group(2)
-    value_start = match.start(4)
-    return (field_name, value_start)
+    return (match.group(1), match.end())
 
 
 def _is_field_name(line: str, character: int, word: str) -> bool:
@@ -316,9 +460,7 @@ def _is_field_name(line: str, character: int, word: str) -> bool:
     Ex: '    ordem_1a: valor' → True para 'ordem_1a'
     """
     # Encontra a posição da palavra na linha
-    word_end = character
-    while word_end < len(line) and _WORD_CHARS.match(line[word_end]):
-        word_end += 1
+    word_end = _WORD_RUN.match(line, character).end()
 
     # Verifica se há ':' após a palavra (possivelmente com espaços)
     rest = line[word_end:].lstrip()
@@ -30,6 +30,9 @@ from lsprotocol.types import (
     Position,
 )
 
+from synesis_lsp.cache import get_document_lines
+from synesis_lsp.hover import _find_field_spec
+
 BIBREF_PATTERN = re.compile(r"@([\w._-]+)")
 _FIELD_LINE = re.compile(r"^(\s*)(\w+)\s*:\s*(.+?)\s*$")
 
@@ -38,7 +41,7 @@ _MAX_DESC_LEN = 55
 
 
 def compute_inlay_hints(
-    source: str, cached_result, range_=None
+    source: str, cached_result, range_=None, uri: Optional[str] = None
 ) -> list[InlayHint]:
     """
     Computa inlay hints para @bibrefs e campos ORDERED/ENUMERATED.
@@ -47,6 +50,8 @@ def compute_inlay_hints(
         source: Texto-fonte do documento
         cached_result: CachedCompilation do workspace_cache (pode ser None)
         range_: Range LSP opcional para limitar hints à área visível
+        uri: URI do documento; quando informado, reaproveita as linhas
+            memoizadas (cache.get_document_lines)
 
     Returns:
         Lista de InlayHint posicionados após o valor em cada linha relevante.
@@ -60,16 +65,25 @@ def compute_inlay_hints(
     template = getattr(result, "template", None)
     field_specs = getattr(template, "field_specs", None) if template else None
 
+    lines = get_document_lines(uri, source)
+    # Só as linhas visíveis são visitadas (O(range), não O(documento))
+    first = 0
+    last = len(lines) - 1
+    if range_:
+        first = max(first, range_.start.line)
+        last = min(last, range_.end.line)
+
     hints = []
-    for line_num, line in enumerate(source.splitlines()):
-        if range_ and (line_num < range_.start.line or line_num > range_.end.line):
-            continue
+    for line_num in range(first, last + 1):
+        line = lines[line_num]
 
         # 1. @bibref → trecho do título
         if bib:
             for match in BIBREF_PATTERN.finditer(line):
                 bibref = match.group(1)
-                entry = bib.get(bibref) or bib.get(bibref.lower())
+                entry = bib.get(bibref)
+                if not entry and not bibref.islower():
+                    entry = bib.get(bibref.lower())
                 if entry:
                     title = entry.get("title", "")
                     if title:
@@ -120,7 +134,7 @@ def _hint_for_value_field(
     if not raw_value or raw_value.startswith("#"):
         return None
 
-    spec = field_specs.get(field_name) or _find_case_insensitive(field_specs, field_name)
+    spec = _find_field_spec(field_specs, field_name)
     if not spec:
         return None
 
@@ -191,12 +205,3 @@ def _hint_enumerated(
         tooltip=tooltip,
         padding_left=True,
     )
-
-
-def _find_case_insensitive(field_specs, name: str):
-    """Busca field_spec ignorando case — fallback para templates com nomes em maiúsculas."""
-    name_lower = name.lower()
-    for key, spec in field_specs.items():
-        if key.lower() == name_lower:
-            return spec
-    return None
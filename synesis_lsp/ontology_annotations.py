@@ -12,41 +12,92 @@ Custom Request:
 from __future__ import annotations
 
 import logging
+import os
+import sys
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 from urllib.parse import unquote, urlparse
 
-from synesis.ast.normalize import normalize_code as _normalize_code
+from synesis.ast.normalize import normalize_code
 
 logger = logging.getLogger(__name__)
 
-_ANNOTATIONS_CACHE: dict[tuple[str, float], dict] = {}
+# LRU: hits movem a entrada para o fim; overflow descarta a menos recente
+_ANNOTATIONS_CACHE: OrderedDict[tuple[str, int, float], dict] = OrderedDict()
 _ANNOTATIONS_CACHE_MAX = 4
 
+# Visões filtradas por active_file do payload em cache:
+# (cache_key, active_file) → payload filtrado. Consultas repetidas sobre o
+# mesmo arquivo (Explorer ocioso) não refazem a filtragem.
+_FILTERED_CACHE: OrderedDict[tuple, dict] = OrderedDict()
+_FILTERED_CACHE_MAX = 32
+
+# Payloads montados sem o cache do projeto completo, por (cache_key, active_file):
+# reabrir o mesmo arquivo antes de uma consulta sem filtro retorna de imediato.
+_FILE_PAYLOAD_CACHE: OrderedDict[tuple, dict] = OrderedDict()
+_FILE_PAYLOAD_CACHE_MAX = 32
+
+# Chaves da ontologia por compilação: id(ontology_index) →
+# (ontology_index, chaves internadas, chaves ordenadas). A referência ao
+# próprio índice valida o id (ids podem ser reaproveitados após o GC).
+_ONTO_KEYS_CACHE: OrderedDict[int, tuple] = OrderedDict()
+_ONTO_KEYS_CACHE_MAX = 4
+
+_MISSING = object()
+
+# Barra invertida → '/' em uma passada (só vale onde ela é separador)
+_SLASH_TABLE = str.maketrans({"\\": "/"})
+_BACKSLASH_IS_SEP = os.sep == "\\" or os.altsep == "\\"
+
+# Strings longas não são internadas (raras e pouco repetidas)
+_INTERN_MAX_LEN = 256
+
+
+def _intern(value: str) -> str:
+    return sys.intern(value) if len(value) < _INTERN_MAX_LEN else value
 
-def _iter_string_values(value):
-    if isinstance(value, str):
-        yield value
-        return
-    if isinstance(value, (list, tuple, set)):
-        for item in value:
-            yield from _iter_string_values(item)
-        return
-    if isinstance(value, dict):
-        for item in value.values():
-            yield from _iter_string_values(item)
 
+# Memoizado: os mesmos códigos são normalizados em cada item, chain e campo.
+# O resultado é internado, então códigos iguais são o mesmo objeto e as
+# comparações/hashes em usage, seen e nos buckets da varredura saem baratos.
+@lru_cache(maxsize=8192)
+def _normalize_code(value: str) -> str:
+    normalized = normalize_code(value)
+    return _intern(normalized) if isinstance(normalized, str) else normalized
 
-def _iter_chain_values(value):
+
+def _iter_string_values(value) -> list[str]:
+    """
+    Strings folha de um valor aninhado, em ordem de travessia (DFS).
+
+    Pilha explícita em vez de recursão com ``yield from``. A ordem importa:
+    os valores são pareados por índice com ``code_locations``.
+    """
+    if isinstance(value, str):
+        return [value]
+    out: list[str] = []
+    stack = [value]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, str):
+            out.append(current)
+        elif isinstance(current, (list, tuple)):
+            stack.extend(reversed(current))
+        elif isinstance(current, set):
+            stack.extend(reversed(tuple(current)))
+        elif isinstance(current, dict):
+            stack.extend(reversed(current.values()))
+    return out
+
+
+def _iter_chain_values(value) -> Iterable:
     if isinstance(value, (list, tuple, set)):
-        for item in value:
-            yield item
-        return
+        return value
     if isinstance(value, dict):
-        for item in value.values():
-            yield item
-        return
-    yield value
+        return value.values()
+    return (value,)
 
 
 def _iter_value_locations(values, locations):
@@ -57,11 +108,15 @@ def _iter_value_locations(values, locations):
 
 
 
-def _select_code_location_values(field_name, locs, item, extra_fields, target):
+def _code_location_candidates(field_name, locs, item, extra_fields) -> list[tuple[str, list[str]]]:
+    """
+    Listas de valores candidatas a alinhar com code_locations[field_name],
+    em ordem de prioridade. Para um código, vale a primeira lista que o contém.
+    """
     field_key = str(field_name).lower()
     if field_key not in {"code", "codes"}:
         values = [str(v) for v in _iter_string_values(extra_fields.get(field_name))]
-        return field_name, values
+        return [(field_name, values)] if values else []
 
     candidates: list[tuple[str, list[str]]] = []
 
@@ -74,42 +129,45 @@ def _select_code_location_values(field_name, locs, item, extra_fields, target):
         if values:
             candidates.append((name, values))
 
-    matched = [(name, values) for name, values in candidates if len(values) == len(locs)]
-    if matched:
-        if target:
-            for name, values in matched:
-                if any(_normalize_code(val) == target for val in values):
-                    return name, values
-        for name, values in matched:
-            if str(name).lower() in {"code", "codes"}:
-                return name, values
-        return matched[0]
+    return [(name, values) for name, values in candidates if len(values) == len(locs)]
 
-    return field_name, []
 
+def _iter_chain_nodes(chain) -> Iterator[str]:
+    """
+    Nós (str não vazias) de uma chain em qualquer formato suportado.
 
-def _chain_nodes(chain) -> list[str]:
+    Gerador: os chamadores só iteram (ou param no primeiro acerto), então
+    nenhuma lista intermediária é montada por chain.
+    """
     if chain is None:
-        return []
+        return
     if isinstance(chain, str):
-        if "->" in chain:
-            return [part.strip() for part in chain.split("->") if part.strip()]
-        return [chain]
+        if "->" not in chain:
+            yield chain
+            return
+        for part in chain.split("->"):
+            part = part.strip()
+            if part:
+                yield part
+        return
     if isinstance(chain, dict):
         nodes = chain.get("nodes")
-        if isinstance(nodes, (list, tuple)):
-            return [n for n in nodes if isinstance(n, str) and n.strip()]
-        for keys in (("from", "relation", "to"), ("subject", "relation", "object")):
-            if all(k in chain for k in keys):
-                parts = [chain[keys[0]], chain[keys[1]], chain[keys[2]]]
-                return [p for p in parts if isinstance(p, str) and p.strip()]
-        return []
-    nodes = getattr(chain, "nodes", None)
-    if isinstance(nodes, (list, tuple)):
-        return [n for n in nodes if isinstance(n, str) and n.strip()]
-    if isinstance(chain, (list, tuple, set)):
-        return [n for n in chain if isinstance(n, str) and n.strip()]
-    return []
+        if not isinstance(nodes, (list, tuple)):
+            for keys in (("from", "relation", "to"), ("subject", "relation", "object")):
+                if all(k in chain for k in keys):
+                    nodes = [chain[keys[0]], chain[keys[1]], chain[keys[2]]]
+                    break
+            else:
+                return
+    else:
+        nodes = getattr(chain, "nodes", None)
+        if not isinstance(nodes, (list, tuple)):
+            if not isinstance(chain, (list, tuple, set)):
+                return
+            nodes = chain
+    for node in nodes:
+        if isinstance(node, str) and node.strip():
+            yield node
 
 
 def _iter_chain_code_locations(chain):
@@ -128,25 +186,75 @@ def _location_line_column(location):
     return (getattr(location, "line", None), getattr(location, "column", None))
 
 
-def _chain_contains_code(chain, code: str) -> bool:
-    target = _normalize_code(code)
-    if isinstance(chain, str) and _normalize_code(chain) == target:
-        return True
-    for node in _chain_nodes(chain):
-        if _normalize_code(node) == target:
-            return True
-    return False
+def _chain_code_set(chain, chain_codes: Optional[dict[int, frozenset[str]]] = None) -> frozenset[str]:
+    """
+    Códigos normalizados referenciados por uma chain (nós e, para str, a chain
+    inteira), extraídos uma vez e memoizados por id(chain) em chain_codes.
+    """
+    if chain_codes is not None:
+        codes = chain_codes.get(id(chain))
+        if codes is not None:
+            return codes
+    found = set(map(_normalize_code, _iter_chain_nodes(chain)))
+    if isinstance(chain, str):
+        found.add(_normalize_code(chain))
+    codes = frozenset(found)
+    if chain_codes is not None:
+        chain_codes[id(chain)] = codes
+    return codes
+
+
+def _field_code_set(
+    value,
+    field_codes: Optional[dict[int, frozenset[str]]] = None,
+    chain_codes: Optional[dict[int, frozenset[str]]] = None,
+) -> frozenset[str]:
+    """
+    Códigos normalizados presentes em um valor de campo: nós de chain dos
+    candidatos e strings folha. Extraídos uma vez e memoizados por id(value)
+    em field_codes; o fallback só testa pertinência por código.
+    """
+    if field_codes is not None:
+        codes = field_codes.get(id(value))
+        if codes is not None:
+            return codes
+    found: set[str] = set()
+    for candidate in _iter_chain_values(value):
+        found |= _chain_code_set(candidate, chain_codes)
+        if not isinstance(candidate, str):
+            # Para str, a string inteira já entrou via _chain_code_set
+            found.update(map(_normalize_code, _iter_string_values(candidate)))
+    codes = frozenset(found)
+    if field_codes is not None:
+        field_codes[id(value)] = codes
+    return codes
 
 
-def _field_value_contains_code(value, code: str) -> bool:
-    target = _normalize_code(code)
-    for candidate in _iter_chain_values(value):
-        if _chain_contains_code(candidate, target):
-            return True
-    for text in _iter_string_values(value):
-        if _normalize_code(text) == target:
-            return True
-    return False
+def _item_code_set(
+    item,
+    item_codes: Optional[dict[int, frozenset[str]]] = None,
+    field_codes: Optional[dict[int, frozenset[str]]] = None,
+    chain_codes: Optional[dict[int, frozenset[str]]] = None,
+) -> frozenset[str]:
+    """
+    Todos os códigos que o fallback de _find_code_in_item pode encontrar no
+    item (campos não vazios e item.chains), memoizados por id(item). Serve de
+    pré-filtro: código fora do conjunto → nenhuma occurrence de fallback.
+    """
+    if item_codes is not None:
+        codes = item_codes.get(id(item))
+        if codes is not None:
+            return codes
+    found: set[str] = set()
+    for field_value in (getattr(item, "extra_fields", {}) or {}).values():
+        if field_value:
+            found |= _field_code_set(field_value, field_codes, chain_codes)
+    for chain in getattr(item, "chains", []) or []:
+        found |= _chain_code_set(chain, chain_codes)
+    codes = frozenset(found)
+    if item_codes is not None:
+        item_codes[id(item)] = codes
+    return codes
 
 
 def _source_file(src) -> Optional[str]:
@@ -175,7 +283,6 @@ def _merge_code_usage_with_chains(
         if not norm:
             continue
         usage[norm] = list(items) if items else []
-        seen[norm] = {id(item) for item in usage[norm]}
 
     sources = getattr(lp, "sources", {}) or {}
     if isinstance(sources, dict):
@@ -185,6 +292,9 @@ def _merge_code_usage_with_chains(
     else:
         sources_iter = []
 
+    # Interseção com as chaves internadas: hits comparam por ponteiro
+    onto_keys = _ontology_keys(ontology_index)[0] if ontology_index is not None else None
+
     for src in sources_iter:
         # PRE-FILTRO (Fase 7): pular sources de outros arquivos quando active_file fornecido
         if active_file:
@@ -193,39 +303,71 @@ def _merge_code_usage_with_chains(
                 continue
 
         for item in getattr(src, "items", []) or []:
+            # Nós normalizados do item coletados primeiro (um item pode citar o
+            # mesmo código várias vezes), filtrados pela ontologia com uma
+            # interseção de conjuntos e registrados uma vez cada em usage/seen
+            item_codes: set[str] = set()
+
             # Add codes found in chains (item.chains + chain-like extra fields)
             chains = getattr(item, "chains", None) or []
             for chain in chains:
-                for node in _chain_nodes(chain):
-                    if ontology_index is not None and _normalize_code(node) not in ontology_index:
-                        continue
-                    _add_item_to_usage(usage, seen, node, item)
+                item_codes.update(map(_normalize_code, _iter_chain_nodes(chain)))
 
             extra_fields = getattr(item, "extra_fields", {}) or {}
             for value in extra_fields.values():
                 for candidate in _iter_chain_values(value):
-                    nodes = _chain_nodes(candidate)
-                    if not nodes:
-                        continue
-                    for node in nodes:
-                        if ontology_index is not None and _normalize_code(node) not in ontology_index:
-                            continue
-                        _add_item_to_usage(usage, seen, node, item)
+                    item_codes.update(map(_normalize_code, _iter_chain_nodes(candidate)))
+
+            if onto_keys is not None and item_codes:
+                item_codes = item_codes & onto_keys
+            if item_codes:
+                _add_item_to_usage(usage, seen, item_codes, item)
 
     return usage
 
 
-def _add_item_to_usage(usage: dict, seen: dict, code: str, item) -> None:
-    norm = _normalize_code(code)
-    if not norm:
-        return
-    bucket = usage.setdefault(norm, [])
-    bucket_seen = seen.setdefault(norm, set())
+def _ontology_keys(ontology_index) -> tuple[frozenset[str], tuple[str, ...]]:
+    """
+    Chaves de ontology_index internadas (frozenset) e ordenadas, calculadas
+    uma vez por compilação em vez de a cada merge/consulta.
+    """
+    key = id(ontology_index)
+    entry = _ONTO_KEYS_CACHE.get(key)
+    if entry is not None and entry[0] is ontology_index and len(entry[1]) == len(ontology_index):
+        _ONTO_KEYS_CACHE.move_to_end(key)
+        return entry[1], entry[2]
+    codes = frozenset(
+        _intern(code) if isinstance(code, str) else code for code in ontology_index
+    )
+    ordered = tuple(sorted(ontology_index))
+    _ONTO_KEYS_CACHE[key] = (ontology_index, codes, ordered)
+    if len(_ONTO_KEYS_CACHE) > _ONTO_KEYS_CACHE_MAX:
+        _ONTO_KEYS_CACHE.popitem(last=False)
+    return codes, ordered
+
+
+def _add_item_to_usage(usage: dict, seen: dict, codes: set[str], item) -> None:
+    """
+    Registra item sob cada código (já normalizado) de codes, sem repetir o item.
+
+    Os ids de um bucket vindo de code_usage só são montados no primeiro
+    acréscimo a ele: códigos que nenhuma chain cita não pagam o set.
+    """
     item_id = id(item)
-    if item_id in bucket_seen:
-        return
-    bucket_seen.add(item_id)
-    bucket.append(item)
+    for norm in codes:
+        if not norm:
+            continue
+        bucket_seen = seen.get(norm)
+        if bucket_seen is None:
+            bucket = usage.get(norm)
+            if bucket is None:
+                usage[norm] = [item]
+                seen[norm] = {item_id}
+                continue
+            bucket_seen = seen[norm] = set(map(id, bucket))
+        if item_id not in bucket_seen:
+            bucket_seen.add(item_id)
+            usage[norm].append(item)
 
 
 def _annotations_cache_key(cached_result, workspace_root: Optional[Path]) -> Optional[tuple[str, int, float]]:
@@ -239,17 +381,57 @@ def _annotations_cache_key(cached_result, workspace_root: Optional[Path]) -> Opt
     return (root_key, id(cached_result), float(timestamp))
 
 
-def _annotations_cache_set(key: Optional[tuple[str, float]], value: dict) -> None:
+def _annotations_cache_set(key: Optional[tuple[str, int, float]], value: dict) -> None:
     if not key:
         return
     _ANNOTATIONS_CACHE[key] = value
+    _ANNOTATIONS_CACHE.move_to_end(key)
     if len(_ANNOTATIONS_CACHE) > _ANNOTATIONS_CACHE_MAX:
-        oldest_key = next(iter(_ANNOTATIONS_CACHE))
-        if oldest_key != key:
-            _ANNOTATIONS_CACHE.pop(oldest_key, None)
+        _ANNOTATIONS_CACHE.popitem(last=False)
+
 
+def clear_occurrences_cache() -> None:
+    """Descarta payloads e chaves memoizados (chamado a cada nova compilação)."""
+    _ANNOTATIONS_CACHE.clear()
+    _FILTERED_CACHE.clear()
+    _FILE_PAYLOAD_CACHE.clear()
+    _ONTO_KEYS_CACHE.clear()
 
+
+@lru_cache(maxsize=4096)
+def _relative_to_root(file_path: str, root: str) -> Optional[str]:
+    """
+    Equivale a ``str(Path(file_path).relative_to(root))``, ou None se o
+    arquivo está fora da raiz. Memoizado por (arquivo, raiz).
+
+    Caminho rápido: corte de prefixo quando o restante já está na forma que
+    o Path produziria (sem separadores duplicados, '.' ou barra final).
+    """
+    sep = os.sep
+    prefix = root if root.endswith(sep) else root + sep
+    if file_path.startswith(prefix):
+        rest = file_path[len(prefix):]
+        if (
+            rest
+            and rest != "."
+            and not rest.startswith(sep)
+            and not rest.endswith(sep)
+            and not rest.startswith("." + sep)
+            and not rest.endswith(sep + ".")
+            and sep + sep not in rest
+            and sep + "." + sep not in rest
+            and not (os.altsep and os.altsep in rest)
+        ):
+            return rest
+    try:
+        return str(Path(file_path).relative_to(root))
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=4096)
 def _normalize_path_value(value: str) -> str:
+    # Memoizado: os mesmos poucos arquivos se repetem em todas as occurrences
     if not value:
         return ""
     if value.startswith("file://"):
@@ -259,34 +441,97 @@ def _normalize_path_value(value: str) -> str:
             path_val = f"//{parsed.netloc}{path_val}"
         if len(path_val) >= 3 and path_val[0] == "/" and path_val[2] == ":":
             path_val = path_val[1:]
-        return Path(path_val).as_posix()
+        return _as_posix(path_val)
+    return _as_posix(value)
+
+
+def _as_posix(value: str) -> str:
+    """``Path(value).as_posix()``, sem construir o Path nos casos triviais."""
+    if value and _is_canonical_posix(value):
+        return value
+    # No Windows a barra invertida é separador: Path só trocaria as barras
+    if _BACKSLASH_IS_SEP and "\\" in value:
+        converted = value.translate(_SLASH_TABLE)
+        if _is_canonical_posix(converted):
+            return converted
     return Path(value).as_posix()
 
 
+def _is_canonical_posix(value: str) -> bool:
+    """True se ``Path(value).as_posix()`` devolveria o próprio valor."""
+    if _BACKSLASH_IS_SEP and value[1:2] == ":":
+        # Drive do Windows: 'C:.' e 'C:./x' viram 'C:' e 'C:x'
+        rest = value[2:]
+        if rest == "." or rest.startswith("./"):
+            return False
+    return not (
+        "\\" in value
+        or "//" in value
+        or "/./" in value
+        or value.startswith("./")
+        or value.endswith("/")
+        or value.endswith("/.")
+    )
+
+
 def _file_matches(active_file: str, relative_file: str) -> bool:
-    normalized_active = _normalize_path_value(active_file)
-    normalized_relative = _normalize_path_value(relative_file)
+    return _normalized_paths_match(
+        _normalize_path_value(active_file), _normalize_path_value(relative_file)
+    )
+
+
+def _normalized_paths_match(normalized_active: str, normalized_relative: str) -> bool:
     return (
         normalized_active in normalized_relative
         or normalized_relative in normalized_active
     )
 
 
+def _filtered_payload(cache_key: tuple, payload: dict, active_file: str) -> dict:
+    """_filter_annotations_by_file memoizado por (cache_key, active_file)."""
+    key = (cache_key, active_file)
+    filtered = _FILTERED_CACHE.get(key)
+    if filtered is not None:
+        _FILTERED_CACHE.move_to_end(key)
+        return filtered
+    filtered = _filter_annotations_by_file(payload, active_file)
+    _FILTERED_CACHE[key] = filtered
+    if len(_FILTERED_CACHE) > _FILTERED_CACHE_MAX:
+        _FILTERED_CACHE.popitem(last=False)
+    return filtered
+
+
 def _filter_annotations_by_file(payload: dict, active_file: str) -> dict:
     if not payload or "annotations" not in payload:
         return payload
 
+    # active_file é normalizado uma vez; o resultado por arquivo de occurrence
+    # é memoizado (os mesmos poucos arquivos se repetem em todo o payload)
+    normalized_active = _normalize_path_value(active_file)
+    matches: dict[str, bool] = {}
+
     filtered = []
     for annotation in payload.get("annotations", []):
-        occurrences = annotation.get("occurrences", []) or []
-        filtered_occurrences = [
-            occ for occ in occurrences
-            if occ.get("file") and _file_matches(active_file, occ["file"])
-        ]
+        raw_occurrences = annotation.get("occurrences")
+        occurrences = raw_occurrences or []
+        filtered_occurrences = []
+        for occ in occurrences:
+            file_val = occ.get("file")
+            if not file_val:
+                continue
+            hit = matches.get(file_val)
+            if hit is None:
+                hit = matches[file_val] = _normalized_paths_match(
+                    normalized_active, _normalize_path_value(file_val)
+                )
+            if hit:
+                filtered_occurrences.append(occ)
 
-        new_entry = dict(annotation)
-        new_entry["occurrences"] = filtered_occurrences
-        filtered.append(new_entry)
+        # Nada filtrado: a annotation original é compartilhada em vez de copiada
+        if isinstance(raw_occurrences, list) and len(filtered_occurrences) == len(raw_occurrences):
+            filtered.append(annotation)
+        else:
+            filtered.append({**annotation, "occurrences": filtered_occurrences})
 
     return {"success": True, "annotations": filtered}
 
@@ -339,14 +584,21 @@ def get_ontology_annotations(
     # (caminho rápido que evita recompilação completa).
     cached_payload = _ANNOTATIONS_CACHE.get(cache_key) if cache_key else None
     if cached_payload is not None:
+        _ANNOTATIONS_CACHE.move_to_end(cache_key)
         if active_file:
-            return _filter_annotations_by_file(cached_payload, active_file)
+            return _filtered_payload(cache_key, cached_payload, active_file)
         return cached_payload
 
+    # Retorno antecipado: este arquivo já foi montado para esta compilação
+    file_key = (cache_key, active_file) if cache_key and active_file else None
+    file_payload = _FILE_PAYLOAD_CACHE.get(file_key) if file_key else None
+    if file_payload is not None:
+        _FILE_PAYLOAD_CACHE.move_to_end(file_key)
+        return file_payload
+
     # Extrair dados da ontologia e code_usage.
     # Fase 7: passar active_file para pre-filtrar sources antes de iterar chains.
     ontology_index = getattr(lp, "ontology_index", {}) or {}
-    code_usage = _merge_code_usage_with_chains(lp, ontology_index, active_file=active_file)
 
     if not ontology_index:
         logger.debug("Ontology index vazio, retornando lista vazia")
@@ -354,10 +606,21 @@ def get_ontology_annotations(
         _annotations_cache_set(cache_key, result)
         return _filter_annotations_by_file(result, active_file) if active_file else result
 
-    # Para cada conceito da ontologia, buscar suas occurrences
+    # Para cada conceito da ontologia, buscar suas occurrences.
+    # Cada item é varrido uma só vez para todos os códigos que referencia.
+    code_usage = _merge_code_usage_with_chains(lp, ontology_index, active_file=active_file)
     annotations = []
+    item_contexts: dict[int, Optional[tuple]] = {}
+    chain_codes: dict[int, frozenset[str]] = {}
+    field_codes: dict[int, frozenset[str]] = {}
+    item_codes: dict[int, frozenset[str]] = {}
+
+    # Percorre os códigos já ordenados: ordena só as chaves (str) em vez de
+    # ordenar as annotations depois com uma key function por elemento; a
+    # ordenação é feita uma vez por compilação (_ontology_keys)
+    for code in _ontology_keys(ontology_index)[1]:
+        onto_node = ontology_index[code]
 
-    for code, onto_node in ontology_index.items():
         # Informações da definição na ontologia
         onto_location = getattr(onto_node, "location", None)
         ontology_file = None
@@ -366,9 +629,8 @@ def get_ontology_annotations(
         if onto_location:
             onto_file_path = getattr(onto_location, "file", None)
             if onto_file_path and effective_root:
-                try:
-                    ontology_file = str(Path(onto_file_path).relative_to(effective_root))
-                except ValueError:
+                ontology_file = _relative_to_root(str(onto_file_path), str(effective_root))
+                if ontology_file is None:
                     ontology_file = onto_file_path
             else:
                 ontology_file = onto_file_path
@@ -383,7 +645,11 @@ def get_ontology_annotations(
             code=code,
             items=items,
             workspace_root=effective_root,
-            active_file=None
+            active_file=None,
+            item_contexts=item_contexts,
+            chain_codes=chain_codes,
+            field_codes=field_codes,
+            item_codes=item_codes,
         )
 
         # Deduplicate occurrences (Phase 1 only - exact match)
@@ -403,15 +669,16 @@ def get_ontology_annotations(
 
         annotations.append(annotation)
 
-    # Ordenar por code name
-    annotations.sort(key=lambda a: a["code"])
-
     result = {"success": True, "annotations": annotations}
     # Só armazenar no cache global quando o resultado é para o projeto completo.
     # Com active_file, code_usage foi pré-filtrado por source — resultado parcial
     # não deve ser reutilizado para consultas sem filtro.
     if not active_file:
         _annotations_cache_set(cache_key, result)
+    elif file_key:
+        _FILE_PAYLOAD_CACHE[file_key] = result
+        if len(_FILE_PAYLOAD_CACHE) > _FILE_PAYLOAD_CACHE_MAX:
+            _FILE_PAYLOAD_CACHE.popitem(last=False)
     return result
 
 
@@ -419,7 +686,11 @@ def _build_occurrences(
     code: str,
     items: list,
     workspace_root: Optional[Path],
-    active_file: Optional[str]
+    active_file: Optional[str],
+    item_contexts: Optional[dict[int, Optional[tuple]]] = None,
+    chain_codes: Optional[dict[int, frozenset[str]]] = None,
+    field_codes: Optional[dict[int, frozenset[str]]] = None,
+    item_codes: Optional[dict[int, frozenset[str]]] = None,
 ) -> list[dict]:
     """
     Constrói lista de occurrences com posição detalhada.
@@ -429,111 +700,140 @@ def _build_occurrences(
         items: Lista de items onde o código aparece
         workspace_root: Raiz do workspace para relativizar paths
         active_file: Se fornecido, filtra apenas esse arquivo
+        item_contexts: Memo id(item) → _item_context, compartilhado entre códigos
+        chain_codes: Memo id(chain) → códigos da chain, compartilhado entre códigos
+        field_codes: Memo id(valor) → códigos do campo, compartilhado entre códigos
+        item_codes: Memo id(item) → códigos do item, compartilhado entre códigos
 
     Returns:
         Lista de occurrences com file, itemName, line, column, context, field
     """
     occurrences = []
+    if item_contexts is None:
+        item_contexts = {}
+    # Invariantes do laço: normalização do active_file e paths já vistos
+    normalized_active = Path(active_file).as_posix() if active_file else None
+    posix_paths: dict[str, str] = {}
+    # Laço por (código, item): código normalizado e métodos ligados uma vez
+    target = _normalize_code(code)
+    get_context = item_contexts.get
+    extend = occurrences.extend
 
     for item in items:
-        # Extrair location do item (fallback para source.location)
-        location = getattr(item, "location", None)
-        if not location or not getattr(location, "file", None):
-            source = getattr(item, "source", None)
-            location = getattr(source, "location", None) if source else location
-        if not location:
+        # Location, path relativo, nome e varredura: uma vez por item,
+        # não uma vez por (código, item)
+        context = get_context(id(item), _MISSING)
+        if context is _MISSING:
+            context = item_contexts[id(item)] = _item_context(item, workspace_root)
+        if context is None:
             continue
-
-        file_path = getattr(location, "file", None)
-        if not file_path:
-            continue
-        file_path = str(file_path)  # SourceLocation.file pode ser WindowsPath
-
-        # Relativizar path
-        relative_file = file_path
-        if workspace_root:
-            try:
-                relative_file = str(Path(file_path).relative_to(workspace_root))
-            except ValueError:
-                pass
+        relative_file, item_name, scan = context
 
         # Filtrar por active_file se fornecido
-        if active_file:
+        if normalized_active:
             # Normalizar paths para comparação
-            normalized_active = Path(active_file).as_posix()
-            normalized_relative = Path(relative_file).as_posix()
+            normalized_relative = posix_paths.get(relative_file)
+            if normalized_relative is None:
+                normalized_relative = posix_paths[relative_file] = Path(relative_file).as_posix()
 
             if normalized_active not in normalized_relative and normalized_relative not in normalized_active:
                 continue
 
-        # Extrair nome do item
-        item_name = getattr(item, "name", None) or getattr(item, "id", "unknown")
-
-        # Procurar code nos campos do item
-        item_occurrences = _find_code_in_item(code, item, relative_file, item_name)
-        occurrences.extend(item_occurrences)
+        # Procurar code nos campos do item: posições precisas direto da
+        # varredura; _find_code_in_item só para o fallback
+        hits = scan.get(target)
+        if hits:
+            extend(hits)
+            continue
+        extend(
+            _find_code_in_item(
+                code, item, relative_file, item_name, scan,
+                chain_codes, field_codes, item_codes,
+            )
+        )
 
     return occurrences
 
 
-def _find_code_in_item(
-    code: str,
-    item,
-    file_path: str,
-    item_name: str
-) -> list[dict]:
+def _item_context(
+    item, workspace_root: Optional[Path]
+) -> Optional[tuple[str, str, dict[str, list[dict]]]]:
     """
-    Procura code em todos os campos do item e retorna occurrences.
+    (path relativo, nome, varredura) de um item, ou None se o item não tem
+    arquivo. Independe do código procurado.
+    """
+    # Extrair location do item (fallback para source.location)
+    location = getattr(item, "location", None)
+    if not location or not getattr(location, "file", None):
+        source = getattr(item, "source", None)
+        location = getattr(source, "location", None) if source else location
+    if not location:
+        return None
 
-    Args:
-        code: Código a procurar
-        item: Item onde procurar
-        file_path: Path do arquivo (relativo)
-        item_name: Nome do item
+    file_path = getattr(location, "file", None)
+    if not file_path:
+        return None
+    file_path = str(file_path)  # SourceLocation.file pode ser WindowsPath
+
+    # Relativizar path
+    relative_file = None
+    if workspace_root:
+        relative_file = _relative_to_root(file_path, str(workspace_root))
+    if relative_file is None:
+        relative_file = file_path
+
+    # Extrair nome do item
+    item_name = getattr(item, "name", None) or getattr(item, "id", "unknown")
+
+    return (relative_file, item_name, _scan_item_occurrences(item, relative_file, item_name))
+
+
+def _scan_item_occurrences(item, file_path: str, item_name: str) -> dict[str, list[dict]]:
+    """
+    Varre uma única vez as posições precisas do item (code_locations, chains
+    e chains em extra_fields) para todos os códigos ao mesmo tempo.
 
     Returns:
-        Lista de occurrences encontradas neste item
+        Código normalizado → occurrences precisas, na ordem de varredura
     """
-    occurrences = []
+    found: dict[str, list[dict]] = {}
     seen: set[tuple] = set()
-    target = _normalize_code(code)
 
-    # Extrair location base do item
-    location = getattr(item, "location", None)
-    item_line = getattr(location, "line", 1) if location else 1
-    item_column = getattr(location, "column", 1) if location else 1
+    def _add(norm, loc, field, context, field_key):
+        line, column = _location_line_column(loc)
+        if line is None or column is None:
+            return
+        key = (norm, line, column, field_key, context)
+        if key in seen:
+            return
+        seen.add(key)
+        found.setdefault(norm, []).append(
+            {
+                "file": file_path,
+                "itemName": item_name,
+                "line": line,
+                "column": column,
+                "context": context,
+                "field": field,
+            }
+        )
 
-    # Procurar em extra_fields (CODE, CHAIN, etc.)
     extra_fields = getattr(item, "extra_fields", {}) or {}
 
-    # Preferir posições precisas fornecidas pelo compilador
+    # Preferir posições precisas fornecidas pelo compilador. Cada código fica
+    # com a primeira lista candidata que o contém.
     code_locations = getattr(item, "code_locations", None) or {}
     for field_name, locs in code_locations.items():
-        value_field, values = _select_code_location_values(
-            field_name, locs, item, extra_fields, target
-        )
-        if not values:
-            continue
-        for value, loc in _iter_value_locations(values, locs):
-            if _normalize_code(value) != target:
-                continue
-            line, column = _location_line_column(loc)
-            if line is None or column is None:
-                continue
-            key = (file_path, line, column, (value_field or "").lower(), "code")
-            if key in seen:
-                continue
-            seen.add(key)
-            occurrences.append(
-                {
-                    "file": file_path,
-                    "itemName": item_name,
-                    "line": line,
-                    "column": column,
-                    "context": "code",
-                    "field": value_field,
-                }
-            )
+        owner: dict[str, int] = {}
+        for index, (value_field, values) in enumerate(
+            _code_location_candidates(field_name, locs, item, extra_fields)
+        ):
+            field_key = (value_field or "").lower()
+            for value, loc in _iter_value_locations(values, locs):
+                norm = _normalize_code(value)
+                if not norm or owner.setdefault(norm, index) != index:
+                    continue
+                _add(norm, loc, value_field, "code", field_key)
 
     # Posições precisas para chains em item.chains
     chains = getattr(item, "chains", []) or []
@@ -543,54 +843,65 @@ def _find_code_in_item(
             or getattr(chain, "field", None)
             or "CHAIN"
         )
+        field_key = str(field_name).lower()
         for node, loc in _iter_chain_code_locations(chain):
-            if _normalize_code(node) != target:
-                continue
-            line, column = _location_line_column(loc)
-            if line is None or column is None:
-                continue
-            key = (file_path, line, column, str(field_name).lower(), "chain")
-            if key in seen:
-                continue
-            seen.add(key)
-            occurrences.append(
-                {
-                    "file": file_path,
-                    "itemName": item_name,
-                    "line": line,
-                    "column": column,
-                    "context": "chain",
-                    "field": field_name,
-                }
-            )
+            _add(_normalize_code(node), loc, field_name, "chain", field_key)
 
     # Posições precisas para chains em extra_fields
     for field_name, field_value in extra_fields.items():
+        field_key = str(field_name).lower()
         for candidate in _iter_chain_values(field_value):
             for node, loc in _iter_chain_code_locations(candidate):
-                if _normalize_code(node) != target:
-                    continue
-                line, column = _location_line_column(loc)
-                if line is None or column is None:
-                    continue
-                key = (file_path, line, column, str(field_name).lower(), "chain")
-                if key in seen:
-                    continue
-                seen.add(key)
-                occurrences.append(
-                    {
-                        "file": file_path,
-                        "itemName": item_name,
-                        "line": line,
-                        "column": column,
-                        "context": "chain",
-                        "field": field_name,
-                    }
-                )
+                _add(_normalize_code(node), loc, field_name, "chain", field_key)
 
+    return found
+
+
+def _find_code_in_item(
+    code: str,
+    item,
+    file_path: str,
+    item_name: str,
+    scan: Optional[dict[str, list[dict]]] = None,
+    chain_codes: Optional[dict[int, frozenset[str]]] = None,
+    field_codes: Optional[dict[int, frozenset[str]]] = None,
+    item_codes: Optional[dict[int, frozenset[str]]] = None,
+) -> list[dict]:
+    """
+    Procura code em todos os campos do item e retorna occurrences.
+
+    Args:
+        code: Código a procurar
+        item: Item onde procurar
+        file_path: Path do arquivo (relativo)
+        item_name: Nome do item
+        scan: Resultado de _scan_item_occurrences já calculado para o item
+        chain_codes: Memo id(chain) → códigos da chain (ver _chain_code_set)
+        field_codes: Memo id(valor) → códigos do campo (ver _field_code_set)
+        item_codes: Memo id(item) → códigos do item (ver _item_code_set)
+
+    Returns:
+        Lista de occurrences encontradas neste item
+    """
+    if scan is None:
+        scan = _scan_item_occurrences(item, file_path, item_name)
+    target = _normalize_code(code)
+    occurrences = list(scan.get(target, ()))
     if occurrences:
         return occurrences
 
+    # Pré-filtro: o fallback não encontraria o código em nenhum campo/chain
+    if target not in _item_code_set(item, item_codes, field_codes, chain_codes):
+        return occurrences
+
+    # Extrair location base do item
+    location = getattr(item, "location", None)
+    item_line = getattr(location, "line", 1) if location else 1
+    item_column = getattr(location, "column", 1) if location else 1
+
+    # Procurar em extra_fields (CODE, CHAIN, etc.)
+    extra_fields = getattr(item, "extra_fields", {}) or {}
+
     logger.info(
         "getOntologyAnnotations fallback to item location (code=%s, item=%s, file=%s, line=%s, column=%s)",
         code,
@@ -608,7 +919,7 @@ def _find_code_in_item(
         context = "code" if "CODE" in field_name.upper() else "chain"
 
         # Procurar code no field_value (case-insensitive, suporta ChainNode)
-        if _field_value_contains_code(field_value, code):
+        if target in _field_code_set(field_value, field_codes, chain_codes):
             # Para simplificar, usar location do item
             # (cálculo exato de posição seria mais complexo e requer source text)
             occ = {
@@ -624,7 +935,7 @@ def _find_code_in_item(
     # Procurar em chains (se item tem chains)
     chains = getattr(item, "chains", []) or []
     for chain in chains:
-        if _chain_contains_code(chain, code):
+        if target in _chain_code_set(chain, chain_codes):
             # Tentar extrair location específica do chain
             chain_location = _extract_chain_location(chain, location)
             chain_line = getattr(chain_location, "line", item_line) if chain_location else item_line
@@ -643,18 +954,6 @@ def _find_code_in_item(
     return occurrences
 
 
-def _chain_to_string(chain) -> str:
-    """Converte chain para string para busca."""
-    if isinstance(chain, str):
-        return chain
-    elif isinstance(chain, tuple) and len(chain) >= 3:
-        # Triple: (from, rel, to)
-        return f"{chain[0]}-{chain[1]}-{chain[2]}"
-    elif hasattr(chain, "__str__"):
-        return str(chain)
-    return ""
-
-
 def _extract_chain_location(chain, fallback_location):
     """Extrai location de um chain."""
     # Prioridade: tuple[3] → chain.location → fallback
@@ -98,16 +98,21 @@ except ImportError as e:
 from synesis_lsp.abstract_viewer import get_abstract
 from synesis_lsp.blocks import get_blocks
 from synesis_lsp.template_info import serialize_template
-from synesis_lsp.cache import FileState, WorkspaceCache
+from synesis_lsp.cache import FileState, WorkspaceCache, clear_document_lines
 from synesis_lsp.code_actions import compute_code_actions
 from synesis_lsp.completion import compute_completions
 from synesis_lsp.converters import build_diagnostics, enrich_error_message
 from synesis_lsp.definition import compute_definition
 from synesis_lsp.explorer_requests import get_codes, get_excerpts, get_references, get_relations
 from synesis_lsp.graph import get_relation_graph
-from synesis_lsp.hover import _get_word_at_position, compute_hover
+from synesis_lsp.hover import (
+    _get_word_at_position,
+    clear_hover_cache,
+    clear_render_cache,
+    compute_hover,
+)
 from synesis_lsp.inlay_hints import compute_inlay_hints
-from synesis_lsp.ontology_annotations import get_ontology_annotations
+from synesis_lsp.ontology_annotations import clear_occurrences_cache, get_ontology_annotations
 from synesis_lsp.ontology_topics import get_ontology_topics
 from synesis_lsp.references import compute_references
 from synesis_lsp.rename import compute_rename, prepare_rename
@@ -481,6 +486,8 @@ def load_project(ls: SynesisLanguageServer, params) -> dict:
         if not ws_key:
             return {"success": False, "error": "Workspace inválido"}
         ls.workspace_cache.put(ws_key, result, workspace_path, fingerprint=fingerprint)
+        clear_render_cache()
+        clear_occurrences_cache()
 
         # Publicar diagnósticos de compilação para TODOS os arquivos do projeto
         # (não apenas os abertos no editor). Erros cross-file (linkagem, ontologia,
@@ -642,7 +649,13 @@ def hover(ls: SynesisLanguageServer, params: HoverParams):
 
     cached_result = _get_cached_for_uri(ls, uri)
 
-    return compute_hover(doc.source, params.position, cached_result)
+    return compute_hover(
+        doc.source,
+        params.position,
+        cached_result,
+        uri=uri,
+        version=getattr(doc, "version", None),
+    )
 
 
 @server.feature(TEXT_DOCUMENT_INLAY_HINT)
@@ -657,7 +670,7 @@ def inlay_hint(ls: SynesisLanguageServer, params: InlayHintParams):
 
     cached_result = _get_cached_for_uri(ls, uri)
 
-    return compute_inlay_hints(doc.source, cached_result, params.range)
+    return compute_inlay_hints(doc.source, cached_result, params.range, uri=uri)
 
 
 @server.feature(TEXT_DOCUMENT_DEFINITION)
@@ -1537,6 +1550,8 @@ def did_close(ls: SynesisLanguageServer, params: DidCloseTextDocumentParams) ->
 
     # Limpar FileState para evitar memory leak (Fase 2)
     ls._file_states.pop(uri, None)
+    clear_hover_cache(uri)
+    clear_document_lines(uri)
 
     # Limpa diagnósticos
     ls.publish_diagnostics(uri, [])
@@ -0,0 +1,128 @@
+"""Cache invalidation tests for hover and ontology annotations.
+
+The results are memoized per document version and per compilation; these
+verify that a new version, a new compilation or an explicit reset is never
+answered with a stale entry.
+"""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+from lsprotocol.types import Position
+
+URI = "file:///ws/doc.syn"
+
+
+def _bib_compilation(title: str, timestamp: float):
+    entry = {"title": title, "author": "Autor", "year": "2024", "ENTRYTYPE": "article"}
+    result = SimpleNamespace(bibliography={"ref": entry})
+    return SimpleNamespace(result=result, workspace_root="/ws", timestamp=timestamp)
+
+
+def _onto_compilation(codes: list[str]):
+    ontology_index = {code: SimpleNamespace(location=None) for code in codes}
+    lp = SimpleNamespace(ontology_index=ontology_index, code_usage={}, sources={})
+    cached = SimpleNamespace(
+        result=SimpleNamespace(linked_project=lp), workspace_root="/ws", timestamp=1.0
+    )
+    return cached, ontology_index
+
+
+def _codes(payload: dict) -> list[str]:
+    return [annotation["code"] for annotation in payload["annotations"]]
+
+
+@pytest.fixture(autouse=True)
+def _reset_caches():
+    from synesis_lsp.hover import clear_hover_cache
+    from synesis_lsp.ontology_annotations import clear_occurrences_cache
+
+    clear_hover_cache()
+    clear_occurrences_cache()
+    yield
+    clear_hover_cache()
+    clear_occurrences_cache()
+
+
+def test_hover_same_version_is_memoized():
+    from synesis_lsp.hover import compute_hover
+
+    cached = _bib_compilation("Primeiro", 1.0)
+    first = compute_hover("@ref", Position(line=0, character=1), cached, uri=URI, version=1)
+    second = compute_hover("@ref", Position(line=0, character=1), cached, uri=URI, version=1)
+
+    assert first is not None
+    assert second is first
+
+
+def test_hover_new_version_recomputes():
+    from synesis_lsp.hover import compute_hover
+
+    cached = _bib_compilation("Primeiro", 1.0)
+    before = compute_hover("@ref", Position(line=0, character=1), cached, uri=URI, version=1)
+    after = compute_hover("@none", Position(line=0, character=1), cached, uri=URI, version=2)
+
+    assert before is not None
+    assert after is None
+
+
+def test_hover_without_version_is_keyed_by_text():
+    from synesis_lsp.hover import compute_hover
+
+    cached = _bib_compilation("Primeiro", 1.0)
+    before = compute_hover("@ref", Position(line=0, character=1), cached, uri=URI)
+    after = compute_hover("@none", Position(line=0, character=1), cached, uri=URI)
+    again = compute_hover("@ref", Position(line=0, character=1), cached, uri=URI)
+
+    assert before is not None
+    assert after is None
+    assert again is before
+
+
+def test_hover_new_compilation_recomputes():
+    from synesis_lsp.hover import compute_hover
+
+    old = _bib_compilation("Primeiro", 1.0)
+    new = _bib_compilation("Segundo", 2.0)
+    before = compute_hover("@ref", Position(line=0, character=1), old, uri=URI, version=1)
+    after = compute_hover("@ref", Position(line=0, character=1), new, uri=URI, version=1)
+
+    assert "Primeiro" in before.contents.value
+    assert "Segundo" in after.contents.value
+
+
+@pytest.mark.parametrize("active_file", [None, "src/a.syn"])
+def test_clear_occurrences_cache_invalidates_annotations(active_file):
+    from synesis_lsp.ontology_annotations import (
+        clear_occurrences_cache,
+        get_ontology_annotations,
+    )
+
+    cached, ontology_index = _onto_compilation(["alpha"])
+    first = get_ontology_annotations(cached, active_file=active_file)
+    assert _codes(first) == ["alpha"]
+
+    # Mesma compilação (id + timestamp): o payload memoizado é reaproveitado
+    ontology_index["beta"] = SimpleNamespace(location=None)
+    assert get_ontology_annotations(cached, active_file=active_file) is first
+
+    clear_occurrences_cache()
+    assert _codes(get_ontology_annotations(cached, active_file=active_file)) == ["alpha", "beta"]
+
+
+def test_clear_occurrences_cache_invalidates_filtered_views():
+    from synesis_lsp.ontology_annotations import (
+        clear_occurrences_cache,
+        get_ontology_annotations,
+    )
+
+    cached, ontology_index = _onto_compilation(["alpha"])
+    get_ontology_annotations(cached)
+    view = get_ontology_annotations(cached, active_file="src/a.syn")
+    assert get_ontology_annotations(cached, active_file="src/a.syn") is view
+
+    ontology_index["beta"] = SimpleNamespace(location=None)
+    clear_occurrences_cache()
+    assert _codes(get_ontology_annotations(cached, active_file="src/a.syn")) == ["alpha", "beta"]